@@ -0,0 +1,159 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from resample import bucket_codes
+from scoring import SENTIMENTS, SENTIMENT_WEIGHTS, WEIGHTING_SCHEMES, sentiment_codes
+
+# weight applied to each sentiment slice of the cube, in SENTIMENTS order
+SCORE_WEIGHTS = {
+    'Popularity Score': np.ones(len(SENTIMENTS)),
+    'Sentiment Score': SENTIMENT_WEIGHTS,
+}
+
+ONE_DAY = pd.Timedelta(days=1)
+
+
+@dataclass(frozen=True)
+class ScoreCube:
+    """Summed comment_score per (label, time bucket, sentiment).
+
+    values has shape (labels, buckets, sentiments) and holds the magnitude of
+    the weighting scheme the cube was built with. Buckets are calendar days by
+    default or any shorter width given as freq. counts holds the number of
+    comments per (label, bucket), so buckets without any comment can be told
+    apart from buckets whose scores cancel out.
+    """
+    labels: pd.Index
+    buckets: pd.DatetimeIndex
+    values: np.ndarray
+    counts: np.ndarray
+    freq: str = '1D'
+
+    def day_slice(self, start_date, end_date):
+        # both ends are inclusive calendar days
+        start = self.buckets.searchsorted(pd.Timestamp(start_date).floor('D'), side='left')
+        stop = self.buckets.searchsorted(pd.Timestamp(end_date).floor('D') + ONE_DAY, side='left')
+        return slice(start, stop)
+
+    def label_scores(self, start_date, end_date):
+        window = self.values[:, self.day_slice(start_date, end_date), :]
+        return pd.Series(window.sum(axis=(1, 2)), index=self.labels, name='Score')
+
+    def comment_count(self, start_date, end_date, label=None):
+        window = self.day_slice(start_date, end_date)
+        if label is None:
+            return int(self.counts[:, window].sum())
+        if label not in self.labels:
+            return 0
+        return int(self.counts[self.labels.get_loc(label), window].sum())
+
+    def score_series(self, label, start_date, end_date, score_type='Popularity Score'):
+        """Scores of one label per bucket that has at least one comment."""
+        if label not in self.labels:
+            return pd.DataFrame({'date': pd.Series(dtype='datetime64[ns]'), 'score': pd.Series(dtype=float)})
+        row = self.labels.get_loc(label)
+        window = self.day_slice(start_date, end_date)
+        scores = self.values[row, window, :] @ SCORE_WEIGHTS[score_type]
+        active = self.counts[row, window] > 0
+        return pd.DataFrame({'date': self.buckets[window][active], 'score': scores[active]})
+
+
+def build_score_cube(data, scheme='Raw', freq='1D'):
+    """Aggregate the comment table into a ScoreCube in one pass over the rows."""
+    data = data[data['created_utc'].notna()]
+    return _accumulate(data['labeled_submission'], data['created_utc'], sentiment_codes(data['Sentiment']),
+                       WEIGHTING_SCHEMES[scheme](data), freq=freq)
+
+
+def _accumulate(label_values, timestamps, sentiments, scores, counts=None, freq='1D'):
+    label_codes, labels = pd.factorize(label_values)
+    time_codes, buckets = bucket_codes(timestamps, freq)
+
+    keep = label_codes >= 0
+    label_codes, time_codes, sentiments, scores = label_codes[keep], time_codes[keep], sentiments[keep], scores[keep]
+    counts = None if counts is None else counts[keep]
+
+    n_labels, n_buckets, n_sentiments = len(labels), len(buckets), len(SENTIMENTS)
+    cell = label_codes * n_buckets + time_codes
+    values = np.bincount(cell * n_sentiments + sentiments, weights=scores,
+                         minlength=n_labels * n_buckets * n_sentiments)
+    counts = np.bincount(cell, weights=counts, minlength=n_labels * n_buckets).astype(np.int64)
+
+    return ScoreCube(
+        labels=pd.Index(np.asarray(labels)),
+        buckets=buckets,
+        values=values.reshape(n_labels, n_buckets, n_sentiments),
+        counts=counts.reshape(n_labels, n_buckets),
+        freq=freq,
+    )
+
+
+def _grown(capacity, needed):
+    return capacity if needed <= capacity else max(needed, 2 * capacity)
+
+
+class RunningScoreCube:
+    """A daily ScoreCube that is updated one day slice at a time.
+
+    set_day() replaces the slice of a single day with pre-summed (label,
+    sentiment) rows, see ingest.aggregate_batch, so an update costs the size of
+    that day and not of the history. The arrays keep spare capacity for new
+    labels and later days. cube() returns a copy of the used region, so a cube
+    handed out never changes while the running cube is updated.
+    """
+
+    def __init__(self, scheme='Raw'):
+        self.scheme = scheme
+        self.labels = pd.Index([], dtype=object)
+        self.first_day = None
+        self.days = 0
+        self.values = np.zeros((0, 0, len(SENTIMENTS)))
+        self.counts = np.zeros((0, 0), dtype=np.int64)
+
+    def _reserve(self, labels, day):
+        if self.first_day is None:
+            self.first_day = day
+        shift = max((self.first_day - day) // ONE_DAY, 0)
+        days = max(self.days + shift, (day - self.first_day) // ONE_DAY + 1)
+        label_capacity, day_capacity = self.counts.shape
+        if shift or labels > label_capacity or days > day_capacity:
+            # only a day before the first one moves the history
+            values = np.zeros((_grown(label_capacity, labels), _grown(day_capacity, days), len(SENTIMENTS)))
+            counts = np.zeros(values.shape[:2], dtype=np.int64)
+            used = len(self.labels)
+            values[:used, shift:shift + self.days] = self.values[:used, :self.days]
+            counts[:used, shift:shift + self.days] = self.counts[:used, :self.days]
+            self.values, self.counts = values, counts
+            self.first_day -= shift * ONE_DAY
+        self.days = days
+
+    def set_day(self, day, sums):
+        day = pd.Timestamp(day).floor('D')
+        day_labels = pd.Index(pd.unique(sums['labeled_submission'].astype(str).to_numpy()))
+        new_labels = day_labels[~day_labels.isin(self.labels)]
+        self._reserve(len(self.labels) + len(new_labels), day)
+        self.labels = self.labels.append(new_labels)
+
+        column = (day - self.first_day) // ONE_DAY
+        values, counts = self.values[:, column], self.counts[:, column]
+        values[:] = 0
+        counts[:] = 0
+        rows = self.labels.get_indexer(sums['labeled_submission'].astype(str))
+        np.add.at(values, (rows, sentiment_codes(sums['Sentiment'])), sums[self.scheme].to_numpy(dtype=float))
+        np.add.at(counts, rows, sums['count'].to_numpy(dtype=np.int64))
+
+    def clear_day(self, day):
+        if self.first_day is None:
+            return
+        column = (pd.Timestamp(day).floor('D') - self.first_day) // ONE_DAY
+        if 0 <= column < self.days:
+            self.values[:, column] = 0
+            self.counts[:, column] = 0
+
+    def cube(self):
+        labels = len(self.labels)
+        buckets = pd.date_range(self.first_day, periods=self.days, freq='D') if self.days else pd.DatetimeIndex([])
+        return ScoreCube(labels=self.labels, buckets=buckets, values=self.values[:labels, :self.days].copy(),
+                         counts=self.counts[:labels, :self.days].copy())
@@ -0,0 +1,211 @@
+"""Dashboard metrics without Streamlit.
+
+The functions here compute what the dashboard shows for one label: the
+positive/negative area split of the score series, the price development, and
+the gradient series with their lagged correlations. The command line entry
+point computes the full metric set for every label and date window in one run
+and spreads the labels over a process pool:
+
+    python analytics.py --window 14 --output metrics.parquet
+
+Windows too short for correlation.MIN_OVERLAP gradient pairs at the requested
+lag are rejected, since every correlation in them would be NaN.
+"""
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import storage
+from aggregates import build_score_cube
+from correlation import MIN_OVERLAP, lag_profile
+from label_index import LabelIndex
+from resample import align_prices, price_freq
+
+# np.trapz was renamed to np.trapezoid in NumPy 2.0
+trapezoid = getattr(np, 'trapezoid', None) or np.trapz
+
+SCORE_TYPES = ['Popularity Score', 'Sentiment Score']
+
+
+def area_percentages(dates, values):
+    """Share of the area under values that lies above and below zero, in percent."""
+    x_values = (dates - dates.min()) / pd.Timedelta(days=1)
+    positive_area = trapezoid(values[values > 0], x=x_values[values > 0])
+    negative_area = trapezoid(values[values < 0], x=x_values[values < 0])
+
+    total_area = abs(positive_area) + abs(negative_area)
+    positive_percentage = (abs(positive_area) / total_area) * 100 if total_area != 0 else 0
+    negative_percentage = (abs(negative_area) / total_area) * 100 if total_area != 0 else 0
+    return positive_percentage, negative_percentage
+
+
+def price_development(prices):
+    price_first = prices.iloc[0]
+    price_latest = prices.iloc[-1]
+    return ((price_latest - price_first) / price_first) * 100 if price_first != 0 else 0
+
+
+def merge_prices(scores, daily_prices, label, freq='1D'):
+    """Scores joined with the label's last known price per bucket, or None if there is no price data."""
+    coin_column = f"{label}_price"
+    if coin_column not in daily_prices.columns:
+        return None
+    aligned = align_prices(daily_prices[['date', coin_column]], pd.DatetimeIndex(scores['date']), freq)
+    merged_data = scores.assign(price=aligned[coin_column].to_numpy())
+    return merged_data.dropna(subset=['price']).reset_index(drop=True)
+
+
+def coarsen_scores(scores, freq):
+    """Sum a score series into the epoch-aligned buckets of a coarser freq."""
+    return scores.groupby(scores['date'].dt.floor(freq), as_index=False)['score'].sum()
+
+
+def add_gradients(merged_data, freq='1D'):
+    """Score and price gradients between consecutive buckets, see correlation.gradient_matrices.
+
+    The merged rows are laid on the full bucket grid first, so buckets without
+    comments or price show up as missing rows and no gradient spans a gap.
+    """
+    dates = merged_data['date']
+    grid = pd.date_range(dates.min(), dates.max(), freq=freq) if len(dates) else pd.DatetimeIndex([])
+    merged_data = merged_data.set_index('date').reindex(grid).rename_axis('date').reset_index()
+    merged_data['Score Gradient'] = merged_data['score'].diff()
+    merged_data['Price Gradient'] = merged_data['price'].diff()
+    return merged_data
+
+
+def lagged_correlations(merged_data, lag_days=1):
+    """Gradient correlations at lag 0 and +-lag_days buckets, NaN below correlation.MIN_OVERLAP buckets."""
+    profile, _ = lag_profile(merged_data['Score Gradient'].to_numpy(dtype=float)[None],
+                             merged_data['Price Gradient'].to_numpy(dtype=float)[None], lag_days)
+    return {
+        'correlation': profile[0, lag_days],
+        'lagged_correlation': profile[0, 2 * lag_days],
+        'lagged_price_correlation': profile[0, 0],
+    }
+
+
+def label_metrics(cube, daily_prices, label, start_date, end_date, score_type, lag_days=1):
+    """Every dashboard metric for one label and date window as a flat dict."""
+    scores = cube.score_series(label, start_date, end_date, score_type)
+    metrics = {
+        'label': label,
+        'start_date': pd.Timestamp(start_date),
+        'end_date': pd.Timestamp(end_date),
+        'score_type': score_type,
+        'periods': len(scores),
+        'score_total': scores['score'].sum(),
+    }
+    metrics['score_positive_pct'], metrics['score_negative_pct'] = area_percentages(scores['date'], scores['score'])
+
+    # below the price interval the gradients are taken per price interval, see resample.price_freq
+    gradient_freq = price_freq(daily_prices, cube.freq)
+    if gradient_freq != cube.freq:
+        scores = coarsen_scores(scores, gradient_freq)
+    merged_data = merge_prices(scores, daily_prices, label, gradient_freq)
+    if merged_data is None or merged_data.empty:
+        return metrics
+    merged_data = add_gradients(merged_data, gradient_freq)
+    metrics['price_development_pct'] = price_development(merged_data['price'])
+    metrics['score_gradient_growth_pct'], metrics['score_gradient_decline_pct'] = area_percentages(
+        merged_data['date'], merged_data['Score Gradient'])
+    metrics['price_gradient_growth_pct'], metrics['price_gradient_decline_pct'] = area_percentages(
+        merged_data['date'], merged_data['Price Gradient'])
+    metrics.update(lagged_correlations(merged_data, lag_days))
+    return metrics
+
+
+def date_windows(first_day, last_day, window_days=None, step_days=None):
+    """The full range plus, if window_days is given, rolling windows of that many days."""
+    windows = [(first_day, last_day)]
+    if window_days:
+        step = pd.Timedelta(days=step_days or window_days)
+        length = pd.Timedelta(days=window_days - 1)
+        start = first_day
+        while start + length <= last_day:
+            windows.append((start, start + length))
+            start += step
+    return windows
+
+
+_worker_state = {}
+
+
+def _init_worker(source, daily_prices, scheme, freq):
+    _worker_state.update(source=source, daily_prices=daily_prices, scheme=scheme, freq=freq)
+
+
+def _label_rows(label, windows, score_types, lag_days):
+    source, daily_prices = _worker_state['source'], _worker_state['daily_prices']
+    if isinstance(source, LabelIndex):
+        cube = build_score_cube(source.label_rows(label), _worker_state['scheme'], _worker_state['freq'])
+    else:
+        cube = source
+    return [
+        label_metrics(cube, daily_prices, label, start_date, end_date, score_type, lag_days)
+        for start_date, end_date in windows for score_type in score_types
+    ]
+
+
+def batch_metrics(source, daily_prices, windows, scheme='Raw', freq='1D', score_types=SCORE_TYPES, lag_days=1, workers=None):
+    """Metrics for every label and every window, one process pool task per label.
+
+    source is either a ScoreCube, or a LabelIndex from which every worker
+    builds a single-label cube at the given scheme and freq.
+    """
+    labels = list(source.labels)
+    initargs = (source, daily_prices, scheme, freq)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=initargs) as pool:
+        results = pool.map(_label_rows, labels, [windows] * len(labels), [score_types] * len(labels),
+                           [lag_days] * len(labels))
+        rows = [row for label_rows in results for row in label_rows]
+    return pd.DataFrame(rows)
+
+
+def write_metrics(metrics, path):
+    if path.endswith('.parquet'):
+        metrics.to_parquet(path, index=False)
+    else:
+        metrics.to_csv(path, index=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compute the dashboard metrics for every label and date window.")
+    parser.add_argument('--comments', default=storage.COMMENTS_PATH)
+    parser.add_argument('--prices', default=storage.PRICES_PATH)
+    parser.add_argument('--scheme', default='Raw', help="score weighting scheme, see scoring.WEIGHTING_SCHEMES")
+    parser.add_argument('--freq', default='1D', help="time bucket width, e.g. 1D, 1h or 15min")
+    parser.add_argument('--window', type=int, help="also compute rolling windows of this many days")
+    parser.add_argument('--step', type=int, help="days between rolling window starts, defaults to --window")
+    parser.add_argument('--lag', type=int, default=1, help="lag in buckets for the lagged correlations")
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--output', default='metrics.parquet', help="a .parquet or .csv path")
+    args = parser.parse_args()
+
+    data = storage.load_comments(args.comments)
+    daily_prices = storage.load_prices(args.prices)
+    if args.window:
+        gradient_freq = price_freq(daily_prices, args.freq)
+        overlap = pd.Timedelta(days=args.window) // pd.Timedelta(gradient_freq) - 1 - args.lag
+        if overlap < MIN_OVERLAP:
+            parser.error(f"--window {args.window} leaves {overlap} gradient pairs at {gradient_freq} and lag {args.lag}, "
+                         f"correlations need at least {MIN_OVERLAP}")
+    timestamps = data['created_utc'].dropna()
+    windows = date_windows(timestamps.min().floor('D'), timestamps.max().floor('D'), args.window, args.step)
+
+    # below daily resolution a cube over every label gets too large, so workers slice the index per label
+    if pd.Timedelta(args.freq) < pd.Timedelta(days=1):
+        source = LabelIndex(data)
+    else:
+        source = build_score_cube(data, args.scheme, args.freq)
+
+    metrics = batch_metrics(source, daily_prices, windows, args.scheme, args.freq, lag_days=args.lag, workers=args.workers)
+    write_metrics(metrics, args.output)
+    print(f"wrote {len(metrics)} rows for {source.labels.size} labels and {len(windows)} windows to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,20 +1,36 @@
+import os
+import uuid
+
 import streamlit as st
 import pandas as pd
 import altair as alt
-import numpy as np
-
-data_path = 'r_CryptoCurrency_classified_compressed.csv'
-price_data_path = 'daily_prices_dec_2024.csv'
-sample_path = 'r_CryptoCurrency_classified_sample.csv'
-data = pd.read_csv(data_path)
-daily_prices = pd.read_csv(price_data_path)
-sample = pd.read_csv(sample_path)
 
-if 'created_utc' in data.columns:
-    data['created_utc'] = pd.to_datetime(data['created_utc'], dayfirst=True, errors='coerce')
+import analytics
+import cache
+import ingest
+from correlation import MIN_OVERLAP
+from resample import RESOLUTIONS, minmax_decimate, price_freq
+from scoring import available_schemes
+from profiling import Profiler, configure_logging
+from storage import COMMENTS_PATH, PRICES_PATH, SAMPLE_PATH
+
+data_path = COMMENTS_PATH
+price_data_path = PRICES_PATH
+sample_path = SAMPLE_PATH
+# stage timings go to the log when PROFILE_STAGES=1 and to the sidebar panel when it is ticked
+show_performance = st.session_state.get('show_performance', False)
+configure_logging()
+profiler = Profiler(enabled=show_performance or os.environ.get('PROFILE_STAGES') == '1', run_id=uuid.uuid4().hex[:8])
+
+with profiler.stage('load'):
+    # prefer the incrementally ingested store over the static demo month
+    use_store = ingest.has_store(ingest.STORE_DIR)
+    comments_source = cache.store_source(ingest.STORE_DIR) if use_store else cache.source(data_path)
+    prices_source = cache.source(price_data_path)
+    data_columns = cache.data_columns(comments_source)
+    daily_prices = cache.load_prices(prices_source)
+    sample = cache.load_sample(cache.source(sample_path))
 
-if 'date' in daily_prices.columns:
-    daily_prices['date'] = pd.to_datetime(daily_prices['date'], dayfirst=True, errors='coerce')
 
 st.title("Predicting Cryptocurrency Trends and Prices Using Reddit Submissions")
 st.markdown("<span style='color:red'>**This is a demo version of the app and contains only a sample of submissions from r/CryptoCurrency, specifically from December 2024. In the full version, the app will automatically extract new submissions and run in real-time, enabling continuous monitoring of subreddit sentiment.**</span>", unsafe_allow_html=True)
@@ -35,34 +51,46 @@ with st.expander("Expand to read more important informations:"):
 st.header("Trending Cryptocurrencies on Reddit")
 
 
-if 'labeled_submission' in data.columns and 'comment_score' in data.columns:
-    unique_labels = data['labeled_submission'].unique()  # Get all unique labels
+if 'labeled_submission' in data_columns and 'comment_score' in data_columns:
+    unique_labels = cache.score_cube(comments_source, 'Raw').labels  # Get all unique labels
     selected_label = st.sidebar.selectbox("Select a Crypto for time-series visualization:", unique_labels)
 
-    date_min = pd.Timestamp('2024-12-01')
-    date_max = pd.Timestamp('2024-12-31')
+    if use_store:
+        date_min, date_max = cache.score_cube(comments_source, 'Raw').buckets[[0, -1]]
+    else:
+        date_min = pd.Timestamp('2024-12-01')
+        date_max = pd.Timestamp('2024-12-31')
     selected_date_range = st.sidebar.date_input("Select a date range:", [date_min, date_max], min_value=date_min, max_value=date_max)
 
 
+    weighting_scheme = st.sidebar.selectbox("Select a score weighting:", available_schemes(data_columns))
+    score_cube = cache.score_cube(comments_source, weighting_scheme)
+    # the ingestion store only keeps daily aggregates
+    resolution = st.sidebar.selectbox("Select a time resolution:", ['Daily'] if use_store else list(RESOLUTIONS))
+    freq = RESOLUTIONS[resolution]
+    # price gradients need a new price per bucket, so below the price interval they use the price interval
+    gradient_freq = price_freq(daily_prices, freq)
+
     if len(selected_date_range) == 2:
         start_date, end_date = pd.Timestamp(selected_date_range[0]), pd.Timestamp(selected_date_range[1])
     else:
         start_date, end_date = date_min, date_max
 
     # calculate scores
-    scores = {
-        label: data[(data['labeled_submission'] == label) & (data['created_utc'] >= start_date) & (data['created_utc'] <= end_date)]['comment_score'].sum() for label in unique_labels
-    }
-    scores_df = pd.DataFrame(list(scores.items()), columns=['Label', 'Score']).sort_values(by='Score', ascending=False)
+    with profiler.stage('top10') as stage:
+        scores = score_cube.label_scores(start_date, end_date)
+        scores_df = pd.DataFrame({'Label': scores.index, 'Score': scores.to_numpy()}).sort_values(by='Score', ascending=False)
+        if profiler.enabled:
+            stage.rows_in, stage.rows_out = score_cube.comment_count(start_date, end_date), len(scores_df)
 
     top_10_scores_df = scores_df.head(10)
 
     top_10_chart = alt.Chart(top_10_scores_df).mark_bar().encode(
         x=alt.X('Label:N', sort='-y', title="Cryptocurrencies Symbol"),
-        y=alt.Y('Score:Q', title="Raw Score"),
+        y=alt.Y('Score:Q', title=f"Popularity Score ({weighting_scheme})"),
         tooltip=['Label', 'Score']
     ).properties(
-        title="Top 10 Cryptocurrencies by Popularity Score in the Selected Time Range"
+        title=f"Top 10 Cryptocurrencies by Popularity Score ({weighting_scheme}) in the Selected Time Range"
     )
 
     st.altair_chart(top_10_chart, use_container_width=True)
@@ -80,33 +108,15 @@ st.header("Time-Series Score Visualization")
 adjustment_option = st.selectbox("Select Score Type:", ["Popularity Score", "Sentiment Score"], index=1)
 include_price = st.checkbox("Include Daily Price Development [in Red]", value=True) 
 
-if 'created_utc' in data.columns:
-    if adjustment_option == "Popularity Score":
-        score_development = data[(data['labeled_submission'] == selected_label) & (data['created_utc'] >= start_date) & (data['created_utc'] <= end_date)]
-        score_development = score_development.groupby(score_development['created_utc'].dt.date)['comment_score'].sum().reset_index()
-        score_development.columns = ['date', 'score']
-    else:
-        score_development = data[(data['labeled_submission'] == selected_label) & (data['created_utc'] >= start_date) & (data['created_utc'] <= end_date)]
-        score_development['adjusted_score'] = score_development.apply(
-            lambda row: row['comment_score'] if row['Sentiment'] == 'Positive' else -row['comment_score'] if row['Sentiment'] == 'Negative' else 0,
-            axis=1
-        )
-        score_development = score_development.groupby(score_development['created_utc'].dt.date)['adjusted_score'].sum().reset_index()
-        score_development.columns = ['date', 'score']
-
-    score_development['date'] = pd.to_datetime(score_development['date'], errors='coerce')
-
-    x_values = (score_development['date'] - score_development['date'].min()).dt.days
-    y_values = score_development['score']
+if 'created_utc' in data_columns:
+    with profiler.stage('time_series') as stage:
+        score_development = cache.score_series(comments_source, selected_label, start_date, end_date, adjustment_option, weighting_scheme, freq)
 
-    positive_area = np.trapz(y_values[y_values > 0], x=x_values[y_values > 0])
-    negative_area = np.trapz(y_values[y_values < 0], x=x_values[y_values < 0])
+        positive_percentage, negative_percentage = analytics.area_percentages(score_development['date'], score_development['score'])
+        if profiler.enabled:
+            stage.rows_in, stage.rows_out = score_cube.comment_count(start_date, end_date, selected_label), len(score_development)
 
-    total_area = abs(positive_area) + abs(negative_area)
-    positive_percentage = (abs(positive_area) / total_area) * 100 if total_area != 0 else 0
-    negative_percentage = (abs(negative_area) / total_area) * 100 if total_area != 0 else 0
-
-    score_chart = alt.Chart(score_development).mark_line().encode(
+    score_chart = alt.Chart(minmax_decimate(score_development, 'score')).mark_line().encode(
         x=alt.X('date:T', title="Time"),
         y=alt.Y('score:Q', title="Score"),
         tooltip=['date:T', 'score:Q']
@@ -115,19 +125,16 @@ if 'created_utc' in data.columns:
     )
 
     if include_price:
-        daily_prices['date'] = pd.to_datetime(daily_prices['date'], errors='coerce')
-        coin_column = f"{selected_label}_price"
-        if coin_column in daily_prices.columns:
-            merged_data = pd.merge(score_development, daily_prices[['date', coin_column]], on='date', how='inner')
-            merged_data.rename(columns={coin_column: 'price'}, inplace=True)
-
+        with profiler.stage('price_merge', rows_in=len(score_development)) as stage:
+            merged_data = cache.merged_prices(comments_source, prices_source, selected_label, start_date, end_date, adjustment_option, weighting_scheme, freq)
+            stage.rows_out = 0 if merged_data is None else len(merged_data)
+        if merged_data is not None:
             # calculate price development
-            price_first = merged_data['price'].iloc[0]
-            price_latest = merged_data['price'].iloc[-1]
-            price_development = ((price_latest - price_first) / price_first) * 100 if price_first != 0 else 0
+            price_development = analytics.price_development(merged_data['price'])
 
             # Altair chart 
-            score_chart = alt.Chart(merged_data).mark_line().encode(
+            chart_data = minmax_decimate(merged_data, ['score', 'price'])
+            score_chart = alt.Chart(chart_data).mark_line().encode(
                 x=alt.X('date:T', title="Time"),
                 y=alt.Y('score:Q', title="Score"),
                 tooltip=['date:T', 'score:Q']
@@ -135,7 +142,7 @@ if 'created_utc' in data.columns:
                 title=f"Score Development for {selected_label} ({adjustment_option})"
             )
 
-            price_chart = alt.Chart(merged_data).mark_line(color='red').encode(
+            price_chart = alt.Chart(chart_data).mark_line(color='red').encode(
                 x=alt.X('date:T', title="Time"),
                 y=alt.Y('price:Q', title="Price"),
                 tooltip=['date:T', 'price:Q']
@@ -150,7 +157,7 @@ if 'created_utc' in data.columns:
         else:
             st.error(f"Price data for {selected_label} is not available in the daily prices dataset.")
     else:
-        score_chart = alt.Chart(score_development).mark_line().encode(
+        score_chart = alt.Chart(minmax_decimate(score_development, 'score')).mark_line().encode(
             x=alt.X('date:T', title="Time"),
             y=alt.Y('score:Q', title="Score"),
             tooltip=['date:T', 'score:Q']
@@ -171,52 +178,23 @@ if 'created_utc' in data.columns:
 # Time-Series score visualization
 st.header("Gradient Score Dynamic")
 visualization_option = st.selectbox("Select Gradient Score Type:", ["Popularity Score", "Sentiment Score"], index=1)
+if gradient_freq != freq:
+    price_resolution = {width: name for name, width in RESOLUTIONS.items()}.get(gradient_freq, f"every {gradient_freq}")
+    st.info(f"The price data is {price_resolution.lower()}, so gradients and correlations are computed at that resolution instead of {resolution.lower()}; below it every bucket would only carry the last price forward.")
 
-if 'created_utc' in data.columns:
-    if visualization_option == "Popularity Score":
-        selected_time_scores = data[(data['labeled_submission'] == selected_label) & (data['created_utc'] >= start_date) & (data['created_utc'] <= end_date)]
-        selected_time_scores = selected_time_scores.groupby(selected_time_scores['created_utc'].dt.date)['comment_score'].sum().reset_index()
-    else:
-        selected_time_scores = data[(data['labeled_submission'] == selected_label) & (data['created_utc'] >= start_date) & (data['created_utc'] <= end_date)]
-        selected_time_scores['adjusted_score'] = selected_time_scores.apply(
-            lambda row: row['comment_score'] if row['Sentiment'] == 'Positive' else -row['comment_score'] if row['Sentiment'] == 'Negative' else 0,
-            axis=1
-        )
-        selected_time_scores = selected_time_scores.groupby(selected_time_scores['created_utc'].dt.date)['adjusted_score'].sum().reset_index()
-
-    selected_time_scores.columns = ['date', 'score']
-
-    selected_time_scores['date'] = pd.to_datetime(selected_time_scores['date'], errors='coerce')
-    daily_prices['date'] = pd.to_datetime(daily_prices['date'], errors='coerce')
-
+if 'created_utc' in data_columns:
     # Merge with daily prices
-    coin_column = f"{selected_label}_price"
-    if coin_column in daily_prices.columns:
-        merged_data = pd.merge(selected_time_scores, daily_prices[['date', coin_column]], on='date', how='inner')
-        merged_data.rename(columns={coin_column: 'price'}, inplace=True)
-
-        merged_data['Score Gradient'] = merged_data['score'].diff()
-        merged_data['Price Gradient'] = merged_data['price'].diff()
-
-        x_values_gradient = (merged_data['date'] - merged_data['date'].min()).dt.days
-        y_values_gradient_score = merged_data['Score Gradient']
-        y_values_gradient_price = merged_data['Price Gradient']
-
-        positive_area_gradient_score = np.trapz(y_values_gradient_score[y_values_gradient_score > 0], x=x_values_gradient[y_values_gradient_score > 0])
-        negative_area_gradient_score = np.trapz(y_values_gradient_score[y_values_gradient_score < 0], x=x_values_gradient[y_values_gradient_score < 0])
-
-        total_area_gradient_score = abs(positive_area_gradient_score) + abs(negative_area_gradient_score)
-        positive_percentage_gradient_score = (abs(positive_area_gradient_score) / total_area_gradient_score) * 100 if total_area_gradient_score != 0 else 0
-        negative_percentage_gradient_score = (abs(negative_area_gradient_score) / total_area_gradient_score) * 100 if total_area_gradient_score != 0 else 0
-
-        positive_area_gradient_price = np.trapz(y_values_gradient_price[y_values_gradient_price > 0], x=x_values_gradient[y_values_gradient_price > 0])
-        negative_area_gradient_price = np.trapz(y_values_gradient_price[y_values_gradient_price < 0], x=x_values_gradient[y_values_gradient_price < 0])
-
-        total_area_gradient_price = abs(positive_area_gradient_price) + abs(negative_area_gradient_price)
-        positive_percentage_gradient_price = (abs(positive_area_gradient_price) / total_area_gradient_price) * 100 if total_area_gradient_price != 0 else 0
-        negative_percentage_gradient_price = (abs(negative_area_gradient_price) / total_area_gradient_price) * 100 if total_area_gradient_price != 0 else 0
-
-        gradient_chart = alt.Chart(merged_data).mark_line().encode(
+    with profiler.stage('gradient') as stage:
+        merged_data = cache.gradients(comments_source, prices_source, selected_label, start_date, end_date, visualization_option, weighting_scheme, gradient_freq)
+        if profiler.enabled:
+            stage.rows_in = score_cube.comment_count(start_date, end_date, selected_label)
+            stage.rows_out = 0 if merged_data is None else len(merged_data)
+    if merged_data is not None:
+        positive_percentage_gradient_score, negative_percentage_gradient_score = analytics.area_percentages(merged_data['date'], merged_data['Score Gradient'])
+        positive_percentage_gradient_price, negative_percentage_gradient_price = analytics.area_percentages(merged_data['date'], merged_data['Price Gradient'])
+
+        chart_data = minmax_decimate(merged_data, ['Score Gradient', 'Price Gradient'])
+        gradient_chart = alt.Chart(chart_data).mark_line().encode(
             x=alt.X('date:T', title="Time"),
             y=alt.Y('Score Gradient:Q', title="Score Gradient"),
             tooltip=['date:T', 'Score Gradient:Q']
@@ -224,7 +202,7 @@ if 'created_utc' in data.columns:
             title=f"Gradient of Scores for {selected_label} ({visualization_option})"
         )
 
-        price_gradient_chart = alt.Chart(merged_data).mark_line(color='red').encode(
+        price_gradient_chart = alt.Chart(chart_data).mark_line(color='red').encode(
             x=alt.X('date:T', title="Time"),
             y=alt.Y('Price Gradient:Q', title="Price Gradient"),
             tooltip=['date:T', 'Price Gradient:Q']
@@ -248,17 +226,14 @@ else:
 
 
 
-if 'Score Gradient' in merged_data.columns and 'Price Gradient' in merged_data.columns:
-
-    correlation = merged_data[['Score Gradient', 'Price Gradient']].corr().iloc[0, 1]
-
-    # lagged correlations
-    lag_days = 1  
-    merged_data['Lagged Score Gradient'] = merged_data['Score Gradient'].shift(lag_days)
-    lagged_correlation = merged_data[['Lagged Score Gradient', 'Price Gradient']].corr().iloc[0, 1]
-
-    merged_data['Lagged Price Gradient'] = merged_data['Price Gradient'].shift(lag_days)
-    lagged_price_correlation = merged_data[['Score Gradient', 'Lagged Price Gradient']].corr().iloc[0, 1]
+# lagged correlations, one step is one gradient bucket
+lag_days = 1
+with profiler.stage('correlation'):
+    correlation_metrics = cache.correlation_metrics(comments_source, prices_source, selected_label, start_date, end_date, visualization_option, weighting_scheme, lag_days, gradient_freq)
+if correlation_metrics is not None:
+    correlation = correlation_metrics['correlation']
+    lagged_correlation = correlation_metrics['lagged_correlation']
+    lagged_price_correlation = correlation_metrics['lagged_price_correlation']
 
 with st.expander(f"Show metrics for performance and predictive analysis:"):
     st.write("The Gradient Score Dynamic section analyzes how changes (gradients) in Reddit scores and cryptocurrency prices evolve over time. It provides insights into the rate of change in discussion scores and price movements, allowing for a deeper understanding of their dynamic relationship.")
@@ -270,10 +245,33 @@ with st.expander(f"Show metrics for performance and predictive analysis:"):
     st.write(f"- Score-Leads-Price-Corr. = **{lagged_correlation:.2f}**")
     st.write(f"- Price-Leads-Score-Corr. = **{lagged_price_correlation:.2f}**")
     st.write("Lagged correlation measures the relationship between two variables (e.g., Reddit scores and cryptocurrency prices) at different time offsets to identify whether one precedes the other.")
+    st.write(f"Gradients are differences between consecutive periods that both have comments and a price, the same definition as the lead/lag heatmap below, so both show the same correlation at the same lag. Correlations over fewer than {MIN_OVERLAP} overlapping periods are shown as nan.")
     st.write("For predictive analysis, lagged correlation is valuable in determining if changes in Reddit sentiment can predict price movements or if social sentiment merely reacts to market changes. A positive lagged correlation where scores lead prices suggests predictive potential, while prices leading scores imply a reactionary relationship.")
     st.write("This analysis helps investors and researchers assess whether social media sentiment is a useful signal for forecasting market trends, though it does not imply causation and may vary across time or cryptocurrencies.")
 
 
+st.header("Lead/Lag Correlation Across Cryptocurrencies")
+max_lag_days = st.slider("Maximum lag in days:", min_value=1, max_value=14, value=7)
+
+with profiler.stage('lead_lag') as stage:
+    lead_lag_table, lag_profile = cache.lead_lag(comments_source, prices_source, start_date, end_date, visualization_option, weighting_scheme, max_lag_days)
+    stage.rows_out = len(lead_lag_table)
+
+lag_heatmap = alt.Chart(lag_profile).mark_rect().encode(
+    x=alt.X('Lag:O', title="Lag in Days (positive = Reddit Score leads Price)"),
+    y=alt.Y('Coin:N', sort=list(lead_lag_table['Coin']), title="Cryptocurrencies Symbol"),
+    color=alt.Color('Correlation:Q', scale=alt.Scale(scheme='redblue', domain=[-1, 1])),
+    tooltip=['Coin', 'Lag', alt.Tooltip('Correlation:Q', format='.2f'), alt.Tooltip('Overlap:Q', title="Overlapping days")]
+).properties(
+    title=f"Lagged Gradient Correlation for all Cryptocurrencies ({visualization_option})"
+)
+
+st.altair_chart(lag_heatmap, use_container_width=True)
+
+with st.expander("Expand to see the ranked lead/lag table:"):
+    st.write(f"Each row correlates the daily gradient of Reddit scores with the daily gradient of prices for every lag in the selected range. The table is ranked by the strongest correlation where Reddit scores lead prices; Best Lag shows the strongest correlation in either direction. The Overlap columns count the days both gradients are known at that lag; correlations over fewer than {MIN_OVERLAP} days are left out, because a handful of points easily correlates near ±1 by chance.")
+    st.dataframe(lead_lag_table, hide_index=True)
+
 
 st.header("Future Research Potential")
 st.write("Additional efforts could include implementing advanced methods to filter out bot-generated content, reducing noise and ensuring higher data quality. This would help achieve a more reliable analysis of genuine user sentiment. Furthermore, exploring the impact of temporal lags between sentiment changes and market reactions could offer valuable insights into the timing and causality of these dynamics. These enhancements would improve the robustness and predictive power of the analysis.")
@@ -292,7 +290,9 @@ else:
 
 st.sidebar.header("Correlation Analysis")
 
-if lagged_correlation > lagged_price_correlation:
+if pd.isna(lagged_correlation) or pd.isna(lagged_price_correlation):
+    st.sidebar.markdown(f"**There are fewer than {MIN_OVERLAP} overlapping periods of score and price gradients in the selected range, too few for a lagged correlation.**")
+elif lagged_correlation > lagged_price_correlation:
     if lagged_correlation < 0:
         st.sidebar.markdown("<span style='color:green'>**The lagged correlation of indicates that changes in Reddit scores are inversely related to price changes, meaning that an increase in scores often leads to a decrease in prices and vice versa.**</span>", unsafe_allow_html=True)
     elif lagged_correlation < 0.25:
@@ -307,5 +307,16 @@ else:
     st.sidebar.markdown("**The correlation is balanced, indicating that neither Reddit scores nor price changes have a leading influence on the other, suggesting no clear predictive relationship.**")
 
 
+if st.sidebar.checkbox("Show cache debug panel", value=False):
+    with st.sidebar.expander("Cache", expanded=True):
+        st.dataframe(cache.cache_stats(), hide_index=True)
+        if st.button("Clear caches"):
+            cache.clear_all()
+            st.rerun()
 
-
+st.sidebar.checkbox("Show performance panel", value=False, key='show_performance')
+if show_performance:
+    with st.sidebar.expander("Performance", expanded=True):
+        performance = profiler.frame()
+        st.dataframe(performance, hide_index=True)
+        st.write(f"Total: {performance['ms'].sum():.1f} ms")
@@ -0,0 +1,73 @@
+"""Throughput benchmark for the local sentiment classifier in classify.py.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_classify [--rows 1000000] [--workers 1 4 8]
+
+The sample comments are replicated with fresh comment ids to the requested
+size. For every worker count the whole file is classified twice: once with an
+empty cache and once more against the cache the first run filled. Rows per
+second per core is the cold throughput divided by the number of workers.
+Throughput is only half the picture, so the agreement with the labels of the
+sample is printed first.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+import storage
+from classify import BATCH_ROWS, CHUNK_ROWS, agreement, classify_file, classify_texts, evaluate
+
+DATA_PATH = os.path.join('benchmarks', 'data', 'classify', 'comments.csv')
+
+
+def write_input(rows, path=DATA_PATH):
+    sample = pd.read_csv(storage.SAMPLE_PATH)
+    repeats = -(-rows // len(sample))
+    data = pd.concat([sample] * repeats, ignore_index=True).iloc[:rows]
+    data['comment_id'] = [f"bench{index}" for index in range(rows)]
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    data.to_csv(path, index=False)
+    return path
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def run(path, rows, workers, chunksize, batch_rows):
+    with tempfile.TemporaryDirectory() as directory:
+        cache_path, output_path = os.path.join(directory, 'cache.sqlite'), os.path.join(directory, 'out.csv')
+        cold_seconds, _ = timed(classify_file, path, output_path, cache_path, chunksize, batch_rows, workers)
+        warm_seconds, stats = timed(classify_file, path, output_path, cache_path, chunksize, batch_rows, workers)
+    assert stats['cached'] == rows
+    print(f"{rows:>12,} rows  {workers:>3} workers  cold {rows / cold_seconds:>10,.0f} rows/s  "
+          f"{rows / cold_seconds / workers:>10,.0f} rows/s/core  cached {rows / warm_seconds:>10,.0f} rows/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--workers', type=int, nargs='+', default=sorted({1, os.cpu_count()}))
+    parser.add_argument('--chunksize', type=int, default=CHUNK_ROWS)
+    parser.add_argument('--batch', type=int, default=BATCH_ROWS)
+    args = parser.parse_args()
+
+    matching, majority = agreement(evaluate(storage.SAMPLE_PATH))
+    print(f"agreement with the labels of {storage.SAMPLE_PATH}: {matching:.1%}, majority class {majority:.1%}")
+
+    path = write_input(args.rows)
+    texts = pd.read_csv(path, usecols=['comment_body'])['comment_body']
+    seconds, _ = timed(classify_texts, texts)
+    print(f"{args.rows:>12,} rows  lexicon scoring alone, one core  {args.rows / seconds:>10,.0f} rows/s")
+    for workers in args.workers:
+        run(path, args.rows, workers, args.chunksize, args.batch)
+
+
+if __name__ == '__main__':
+    main()
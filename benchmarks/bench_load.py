@@ -0,0 +1,65 @@
+"""Load benchmark: CSV parse vs Parquet read for the bundled datasets.
+
+Run from the repository root after converting the datasets with
+``python storage.py``:
+
+    python -m benchmarks.bench_load
+
+The price table is not converted (see storage.py) and is not listed. Every
+load runs in a fresh worker process so the resident memory numbers are
+not polluted by earlier loads.
+"""
+import argparse
+import multiprocessing
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import storage
+
+DATASETS = [
+    ('comments', storage.COMMENTS_PATH, storage.read_comments_csv, None),
+    ('sample', storage.SAMPLE_PATH, storage.read_sample_csv, storage.SAMPLE_COLUMNS),
+]
+
+
+def _max_rss_mb():
+    # ru_maxrss is reported in kilobytes on Linux and in bytes on macOS
+    scale = 1 if sys.platform == 'darwin' else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 2 ** 20
+
+
+def _measure(name, path, binary, repeat):
+    import pandas  # noqa: F401
+    import pyarrow  # noqa: F401  imported up front so both paths start from the same baseline
+
+    read_csv, columns = dict((dataset, (reader, columns)) for dataset, _, reader, columns in DATASETS)[name]
+    baseline = _max_rss_mb()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        frame = storage.read_binary(path, columns) if binary else read_csv(path)
+        timings.append(time.perf_counter() - start)
+    return min(timings), _max_rss_mb() - baseline, frame.memory_usage(deep=True).sum() / 2 ** 20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context('spawn')
+    print(f"{'dataset':<10}{'format':<9}{'load [s]':>10}{'peak RSS [MB]':>15}{'frame [MB]':>12}")
+    for name, path, _, _ in DATASETS:
+        for binary in (False, True):
+            if binary and not storage.has_fresh_binary(path):
+                print(f"{name:<10}{'parquet':<9}  missing, run `python storage.py` first")
+                continue
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                seconds, rss, frame_mb = pool.submit(_measure, name, path, binary, args.repeat).result()
+            print(f"{name:<10}{'parquet' if binary else 'csv':<9}{seconds:>10.4f}{rss:>15.1f}{frame_mb:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
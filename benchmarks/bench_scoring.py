@@ -0,0 +1,66 @@
+"""Micro-benchmark: row-wise DataFrame.apply scoring vs scoring.adjusted_score.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_scoring [--rows 10000000]
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from scoring import adjusted_score
+
+DATA_PATH = 'r_CryptoCurrency_classified_compressed.csv'
+
+# DataFrame.apply is far too slow to run on millions of rows, so it is timed on
+# a prefix of this size and extrapolated linearly
+APPLY_SAMPLE_ROWS = 200_000
+
+
+def apply_score(data):
+    return data.apply(
+        lambda row: row['comment_score'] if row['Sentiment'] == 'Positive' else -row['comment_score'] if row['Sentiment'] == 'Negative' else 0,
+        axis=1
+    )
+
+
+def best_of(func, data, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(data)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def replicate(data, rows):
+    repeats = -(-rows // len(data))
+    return pd.concat([data] * repeats, ignore_index=True).iloc[:rows]
+
+
+def run(data, repeat):
+    sample = data.iloc[:APPLY_SAMPLE_ROWS]
+    apply_seconds, expected = best_of(apply_score, sample, 1 if len(sample) > 50_000 else repeat)
+    apply_seconds *= len(data) / len(sample)
+    vector_seconds, result = best_of(adjusted_score, data, repeat)
+    assert np.allclose(result[:len(sample)], expected.to_numpy(dtype=float))
+    extrapolated = ' (extrapolated)' if len(sample) < len(data) else ''
+    print(f"{len(data):>12,} rows  apply {apply_seconds:9.3f}s{extrapolated}  "
+          f"vectorized {vector_seconds:8.4f}s  speedup {apply_seconds / vector_seconds:,.0f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10_000_000, help="size of the replicated dataset")
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    data = pd.read_csv(DATA_PATH, usecols=['comment_score', 'Sentiment'])
+    run(data, args.repeat)
+    run(replicate(data, args.rows), args.repeat)
+
+
+if __name__ == '__main__':
+    main()
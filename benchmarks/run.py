@@ -0,0 +1,232 @@
+"""Benchmark suite for the dashboard pipeline.
+
+    python -m benchmarks.run --sizes small medium [--compare benchmarks/results/<earlier>.json]
+
+Every stage of the pipeline is timed in its original app.py form (legacy) and
+in its current form, on synthetic datasets from benchmarks.synthetic. For each
+stage the best wall time of --repeat runs and the peak traced memory of one
+extra run are recorded. Results are written to benchmarks/results/ as JSON,
+so runs can be compared over time.
+
+Legacy stages that are too slow at scale run on a subset of rows or labels and
+are extrapolated linearly; those results are flagged as extrapolated.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+import analytics
+import correlation
+import storage
+from aggregates import build_score_cube
+from benchmarks.synthetic import SIZES, write_dataset
+from label_index import LabelIndex
+from scoring import adjusted_score
+
+DATA_DIR = os.path.join('benchmarks', 'data')
+RESULTS_DIR = os.path.join('benchmarks', 'results')
+
+LEGACY_LABEL_SAMPLE = 20
+APPLY_SAMPLE_ROWS = 200_000
+
+
+# the pipeline as it was written in app.py
+
+def legacy_load(path):
+    data = pd.read_csv(path)
+    data['created_utc'] = pd.to_datetime(data['created_utc'], dayfirst=True, errors='coerce')
+    return data
+
+
+def legacy_top10(data, labels, start_date, end_date):
+    scores = {
+        label: data[(data['labeled_submission'] == label) & (data['created_utc'] >= start_date) & (data['created_utc'] <= end_date)]['comment_score'].sum() for label in labels
+    }
+    return pd.DataFrame(list(scores.items()), columns=['Label', 'Score']).sort_values(by='Score', ascending=False).head(10)
+
+
+def legacy_apply(data):
+    return data.apply(
+        lambda row: row['comment_score'] if row['Sentiment'] == 'Positive' else -row['comment_score'] if row['Sentiment'] == 'Negative' else 0,
+        axis=1
+    )
+
+
+def legacy_window(data, label, start_date, end_date):
+    return data[(data['labeled_submission'] == label) & (data['created_utc'] >= start_date) & (data['created_utc'] <= end_date)]
+
+
+def legacy_daily(data, label, start_date, end_date):
+    score_development = data[(data['labeled_submission'] == label) & (data['created_utc'] >= start_date) & (data['created_utc'] <= end_date)]
+    score_development = score_development.groupby(score_development['created_utc'].dt.date)['comment_score'].sum().reset_index()
+    score_development.columns = ['date', 'score']
+    score_development['date'] = pd.to_datetime(score_development['date'], errors='coerce')
+    return score_development
+
+
+def legacy_merge(scores, daily_prices, label):
+    coin_column = f"{label}_price"
+    merged_data = pd.merge(scores, daily_prices[['date', coin_column]], on='date', how='inner')
+    return merged_data.rename(columns={coin_column: 'price'})
+
+
+def legacy_gradient_correlation(merged_data, lag_days=1):
+    merged_data = merged_data.copy()
+    merged_data['Score Gradient'] = merged_data['score'].diff()
+    merged_data['Price Gradient'] = merged_data['price'].diff()
+    correlation_value = merged_data[['Score Gradient', 'Price Gradient']].corr().iloc[0, 1]
+    merged_data['Lagged Score Gradient'] = merged_data['Score Gradient'].shift(lag_days)
+    lagged_correlation = merged_data[['Lagged Score Gradient', 'Price Gradient']].corr().iloc[0, 1]
+    merged_data['Lagged Price Gradient'] = merged_data['Price Gradient'].shift(lag_days)
+    lagged_price_correlation = merged_data[['Score Gradient', 'Lagged Price Gradient']].corr().iloc[0, 1]
+    return correlation_value, lagged_correlation, lagged_price_correlation
+
+
+def measure(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return min(timings), peak / 2 ** 20
+
+
+class Recorder:
+    def __init__(self, dataset, meta, repeat):
+        self.dataset = dataset
+        self.meta = meta
+        self.repeat = repeat
+        self.results = []
+
+    def __call__(self, stage, implementation, func, scale=1.0, scope='all labels'):
+        seconds, peak_mb = measure(func, self.repeat)
+        result = dict(self.meta, dataset=self.dataset, stage=stage, implementation=implementation, scope=scope,
+                      seconds=seconds * scale, peak_mb=peak_mb, extrapolated=scale != 1.0)
+        self.results.append(result)
+        marker = ' (extrapolated)' if result['extrapolated'] else ''
+        print(f"{self.dataset:<8}{stage:<22}{implementation:<9}{result['seconds']:>11.4f}s{peak_mb:>11.1f} MB  {scope}{marker}")
+
+
+def run_dataset(name, rows, coins, days, repeat):
+    directory = os.path.join(DATA_DIR, name)
+    comments_path, prices_path = os.path.join(directory, 'comments.csv'), os.path.join(directory, 'prices.csv')
+    if not (os.path.exists(comments_path) and os.path.exists(prices_path)):
+        write_dataset(directory, rows, coins, days)
+    record = Recorder(name, {'rows': rows, 'coins': coins, 'days': days}, repeat)
+
+    record('load', 'legacy', lambda: legacy_load(comments_path))
+    record('load', 'csv', lambda: storage.read_comments_csv(comments_path))
+    storage.convert(comments_path, storage.read_comments_csv)
+    record('load', 'parquet', lambda: storage.load_comments(comments_path))
+
+    legacy_data = legacy_load(comments_path)
+    data = storage.load_comments(comments_path)
+    daily_prices = storage.read_prices_csv(prices_path)
+    start_date, end_date = data['created_utc'].min().floor('D'), data['created_utc'].max().floor('D')
+    labels = legacy_data['labeled_submission'].unique()
+    top_label = legacy_data['labeled_submission'].value_counts().index[0]
+
+    label_sample = labels[:LEGACY_LABEL_SAMPLE]
+    record('top10', 'legacy', lambda: legacy_top10(legacy_data, label_sample, start_date, end_date),
+           scale=len(labels) / len(label_sample))
+    record('cube_build', 'current', lambda: build_score_cube(data))
+    cube = build_score_cube(data)
+    record('top10', 'current', lambda: cube.label_scores(start_date, end_date).nlargest(10))
+
+    apply_sample = legacy_data.iloc[:APPLY_SAMPLE_ROWS]
+    record('sentiment_scoring', 'legacy', lambda: legacy_apply(apply_sample), scale=len(legacy_data) / len(apply_sample))
+    record('sentiment_scoring', 'current', lambda: adjusted_score(data))
+
+    record('label_window', 'legacy', lambda: legacy_window(legacy_data, top_label, start_date, end_date), scope='one label')
+    record('index_build', 'current', lambda: LabelIndex(data))
+    index = LabelIndex(data)
+    record('label_window', 'current', lambda: index.window(top_label, start_date, end_date), scope='one label')
+
+    record('daily_groupby', 'legacy', lambda: legacy_daily(legacy_data, top_label, start_date, end_date), scope='one label')
+    record('daily_groupby', 'current', lambda: cube.score_series(top_label, start_date, end_date), scope='one label')
+
+    legacy_scores = legacy_daily(legacy_data, top_label, start_date, end_date)
+    scores = cube.score_series(top_label, start_date, end_date)
+    record('price_merge', 'legacy', lambda: legacy_merge(legacy_scores, daily_prices, top_label), scope='one label')
+    record('price_merge', 'current', lambda: analytics.merge_prices(scores, daily_prices, top_label), scope='one label')
+
+    merged_data = legacy_merge(legacy_scores, daily_prices, top_label)
+    record('gradient_correlation', 'legacy', lambda: legacy_gradient_correlation(merged_data), scope='one label, lag 1')
+
+    def lead_lag():
+        _, _, score_gradient, price_gradient = correlation.gradient_matrices(cube, daily_prices, start_date, end_date)
+        return correlation.lag_profile(score_gradient, price_gradient)
+    record('gradient_correlation', 'current', lead_lag, scope=f"all labels, lags -{correlation.MAX_LAG}..{correlation.MAX_LAG}")
+    return record.results
+
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+    }
+
+
+def compare(results, previous_path):
+    with open(previous_path) as previous_file:
+        previous = {
+            (result['dataset'], result['stage'], result['implementation']): result['seconds']
+            for result in json.load(previous_file)['results']
+        }
+    print(f"\ncompared with {previous_path}")
+    for result in results:
+        key = (result['dataset'], result['stage'], result['implementation'])
+        if key in previous:
+            print(f"{key[0]:<8}{key[1]:<22}{key[2]:<9}{result['seconds'] / previous[key]:>8.2f}x the earlier time")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time and memory benchmarks for the dashboard pipeline.")
+    parser.add_argument('--sizes', nargs='+', choices=list(SIZES), default=['small'])
+    parser.add_argument('--coins', type=int, help="override the number of coins of every size")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--compare', help="an earlier results JSON file")
+    args = parser.parse_args()
+
+    results = []
+    for name in args.sizes:
+        size = dict(SIZES[name])
+        if args.coins:
+            size['coins'] = args.coins
+            name = f"{name}-{args.coins}"
+        results.extend(run_dataset(name, size['rows'], size['coins'], size['days'], args.repeat))
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, datetime.datetime.now().strftime('%Y%m%d-%H%M%S') + '.json')
+    with open(path, 'w') as results_file:
+        json.dump({'environment': environment(), 'results': results}, results_file, indent=2, default=str)
+    print(f"wrote {path}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
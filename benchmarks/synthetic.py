@@ -0,0 +1,96 @@
+"""Synthetic datasets shaped like the bundled CSV files.
+
+    python -m benchmarks.synthetic --rows 1000000 --coins 200 --days 90 --output benchmarks/data/medium
+
+writes comments.csv (the schema of r_CryptoCurrency_classified_compressed.csv)
+and prices.csv (the schema of daily_prices_dec_2024.csv) with the same date
+formats, so they go through exactly the same parsing code as the real files.
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+START_DATE = '2024-12-01'
+
+# symbols of the real price file first, generated ones after that
+KNOWN_SYMBOLS = [
+    'BTC', 'ETH', 'SOL', 'USDT', 'XTZ', 'DOT', 'XRP', 'DOGE', 'LTC', 'ALGO', 'XMR', 'TRX', 'RENDER', 'SUI',
+    'ADA', 'HBAR', 'LINK', 'BNB', 'VET', 'PEPE', 'USDC', 'ARB', 'UNI', 'IMX', 'XLM', 'FLR', 'FLOKI', 'ETC',
+    'GALA', 'INJ', 'ONDO', 'WLD', 'HYPE', 'AVAX', 'MOVE', 'PENGU', 'AAVE', 'TAO', 'ENA', 'TON', 'FARTCOIN',
+]
+
+SIZES = {
+    'small': {'rows': 10_000, 'coins': 40, 'days': 31},
+    'medium': {'rows': 1_000_000, 'coins': 200, 'days': 90},
+    'large': {'rows': 10_000_000, 'coins': 500, 'days': 365},
+}
+
+
+def coin_symbols(coins):
+    generated = [f"C{index:04d}" for index in range(max(coins - len(KNOWN_SYMBOLS), 0))]
+    return (KNOWN_SYMBOLS + generated)[:coins]
+
+
+def generate_comments(rows, coins=40, days=31, start_date=START_DATE, seed=0):
+    rng = np.random.default_rng(seed)
+    symbols = np.array(coin_symbols(coins))
+    # a few coins dominate the discussion, as on r/CryptoCurrency
+    popularity = 1 / np.arange(1, coins + 1)
+    labels = rng.choice(coins, size=rows, p=popularity / popularity.sum())
+
+    minutes = rng.integers(0, days * 24 * 60, size=rows)
+    created_utc = pd.Timestamp(start_date) + pd.to_timedelta(minutes, unit='min')
+
+    scores = np.minimum(rng.zipf(2.2, size=rows), 5000)
+    scores[rng.random(rows) < 0.05] *= -1
+
+    return pd.DataFrame({
+        'comment_score': scores,
+        'created_utc': created_utc,
+        'labeled_submission': symbols[labels],
+        'Sentiment': np.where(rng.random(rows) < 0.6, 'Negative', 'Positive'),
+    })
+
+
+def generate_prices(coins=40, days=31, start_date=START_DATE, seed=0):
+    rng = np.random.default_rng(seed + 1)
+    symbols = coin_symbols(coins)
+    start_prices = 10 ** rng.uniform(-5, 5, size=coins)
+    returns = rng.normal(0, 0.04, size=(days, coins))
+    prices = start_prices * np.exp(np.cumsum(returns, axis=0))
+    # some coins are listed only part of the way through, like HYPE or PENGU
+    listed = rng.integers(0, days // 2 + 1, size=coins) * (rng.random(coins) < 0.1)
+    prices[np.arange(days)[:, None] < listed] = np.nan
+
+    frame = pd.DataFrame(prices, columns=[f"{symbol}_price" for symbol in symbols])
+    frame.insert(0, 'date', pd.date_range(start_date, periods=days, freq='D'))
+    return frame
+
+
+def write_dataset(directory, rows, coins=40, days=31, seed=0):
+    """Write comments.csv and prices.csv in the formats of the real files and return their paths."""
+    os.makedirs(directory, exist_ok=True)
+    comments_path = os.path.join(directory, 'comments.csv')
+    prices_path = os.path.join(directory, 'prices.csv')
+    generate_comments(rows, coins, days, seed=seed).to_csv(comments_path, index=False, date_format='%d/%m/%Y %H:%M')
+    generate_prices(coins, days, seed=seed).to_csv(prices_path, index=False, date_format='%d/%m/%Y')
+    return comments_path, prices_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic comment and price CSV files.")
+    parser.add_argument('--rows', type=int, default=SIZES['small']['rows'])
+    parser.add_argument('--coins', type=int, default=SIZES['small']['coins'])
+    parser.add_argument('--days', type=int, default=SIZES['small']['days'])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=os.path.join('benchmarks', 'data', 'custom'))
+    args = parser.parse_args()
+
+    for path in write_dataset(args.output, args.rows, args.coins, args.days, args.seed):
+        print(f"wrote {path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+"""Shared caches for the dashboard.
+
+Loaded frames and score cubes are cached with st.cache_resource, so every
+session shares one read-only copy. Derived per-label results are small and
+cached with st.cache_data. Both use Streamlit's LRU eviction with a TTL and a
+maximum number of entries.
+
+Loaders are keyed on a source tuple of (path, mtime). Replacing or
+re-converting a dataset therefore changes the key and invalidates everything
+derived from it. For the ingestion store the second element is the version
+of its aggregate partitions instead. clear_all() drops every entry explicitly.
+"""
+import functools
+import os
+import threading
+
+import pandas as pd
+import streamlit as st
+
+import analytics
+import correlation
+import ingest
+import storage
+from aggregates import build_score_cube
+from label_index import LabelIndex
+
+CACHE_TTL = 60 * 60
+DATA_MAX_ENTRIES = 8
+DERIVED_MAX_ENTRIES = 256
+
+_stats = {}
+_stats_lock = threading.Lock()
+_cached_functions = []
+
+
+def cached(resource=False, ttl=CACHE_TTL, max_entries=DERIVED_MAX_ENTRIES):
+    """st.cache_data/st.cache_resource that also counts hits and misses."""
+    def decorator(func):
+        name = func.__name__
+        _stats[name] = {'calls': 0, 'misses': 0}
+
+        @functools.wraps(func)
+        def compute(*args, **kwargs):
+            # only runs when Streamlit has no valid entry
+            with _stats_lock:
+                _stats[name]['misses'] += 1
+            return func(*args, **kwargs)
+
+        cache = st.cache_resource if resource else st.cache_data
+        cached_func = cache(ttl=ttl, max_entries=max_entries, show_spinner=False)(compute)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with _stats_lock:
+                _stats[name]['calls'] += 1
+            return cached_func(*args, **kwargs)
+
+        wrapper.clear = cached_func.clear
+        _cached_functions.append(wrapper)
+        return wrapper
+    return decorator
+
+
+def cache_stats():
+    with _stats_lock:
+        rows = [
+            {'function': name, 'hits': counts['calls'] - counts['misses'], 'misses': counts['misses']}
+            for name, counts in _stats.items()
+        ]
+    return pd.DataFrame(rows, columns=['function', 'hits', 'misses'])
+
+
+def clear_all():
+    for cached_func in _cached_functions:
+        cached_func.clear()
+    with _stats_lock:
+        for counts in _stats.values():
+            counts['calls'] = counts['misses'] = 0
+
+
+def source(csv_path):
+    """Cache key for a dataset: its path and the newest mtime of its CSV/Parquet files."""
+    paths = [path for path in (csv_path, storage.binary_path(csv_path)) if os.path.exists(path)]
+    return csv_path, max((os.path.getmtime(path) for path in paths), default=0.0)
+
+
+@cached(resource=True, max_entries=DATA_MAX_ENTRIES)
+def load_comments(comments_source):
+    return storage.load_comments(comments_source[0])
+
+
+@cached(resource=True, max_entries=DATA_MAX_ENTRIES)
+def load_prices(prices_source):
+    return storage.load_prices(prices_source[0])
+
+
+@cached(resource=True, max_entries=DATA_MAX_ENTRIES)
+def load_sample(sample_source):
+    return storage.load_sample(sample_source[0])
+
+
+def store_source(store_dir):
+    """Cache key for the ingestion store; only day partitions that changed since the last rerun are read."""
+    return store_dir, daily_aggregates(store_dir).refresh()
+
+
+# no TTL: a new reader would re-read every partition instead of only the changed ones
+@cached(resource=True, ttl=None, max_entries=DATA_MAX_ENTRIES)
+def daily_aggregates(store_dir):
+    return ingest.DailyAggregates(store_dir)
+
+
+def data_columns(comments_source):
+    if os.path.isdir(comments_source[0]):
+        schemes = daily_aggregates(comments_source[0]).schemes()
+        return ingest.COLUMNS + (['confidence'] if 'Confidence-weighted' in schemes else [])
+    return list(load_comments(comments_source).columns)
+
+
+@cached(resource=True, max_entries=DATA_MAX_ENTRIES)
+def label_index(comments_source):
+    return LabelIndex(load_comments(comments_source))
+
+
+@cached(resource=True, max_entries=DATA_MAX_ENTRIES)
+def score_cube(comments_source, scheme, freq='1D'):
+    if os.path.isdir(comments_source[0]):
+        if freq != '1D':
+            raise ValueError("The ingestion store only keeps daily aggregates.")
+        return daily_aggregates(comments_source[0]).cube(scheme)
+    return build_score_cube(load_comments(comments_source), scheme, freq)
+
+
+@cached()
+def score_series(comments_source, label, start_date, end_date, score_type, scheme, freq='1D'):
+    if freq == '1D' or os.path.isdir(comments_source[0]):
+        return score_cube(comments_source, scheme, freq).score_series(label, start_date, end_date, score_type)
+    # below daily resolution only the selected label and window are bucketed
+    rows = label_index(comments_source).window(label, start_date, end_date)
+    return build_score_cube(rows, scheme, freq).score_series(label, start_date, end_date, score_type)
+
+
+@cached()
+def merged_prices(comments_source, prices_source, label, start_date, end_date, score_type, scheme, freq='1D'):
+    """Scores joined with the label's last known price per bucket, or None if there is no price data."""
+    scores = score_series(comments_source, label, start_date, end_date, score_type, scheme, freq)
+    return analytics.merge_prices(scores, load_prices(prices_source), label, freq)
+
+
+@cached()
+def gradients(comments_source, prices_source, label, start_date, end_date, score_type, scheme, freq='1D'):
+    merged_data = merged_prices(comments_source, prices_source, label, start_date, end_date, score_type, scheme, freq)
+    if merged_data is None:
+        return None
+    return analytics.add_gradients(merged_data, freq)
+
+
+@cached()
+def correlation_metrics(comments_source, prices_source, label, start_date, end_date, score_type, scheme, lag_days=1, freq='1D'):
+    merged_data = gradients(comments_source, prices_source, label, start_date, end_date, score_type, scheme, freq)
+    if merged_data is None:
+        return None
+    return analytics.lagged_correlations(merged_data, lag_days)
+
+
+@cached()
+def lead_lag(comments_source, prices_source, start_date, end_date, score_type, scheme, max_lag=correlation.MAX_LAG):
+    """Ranked lead/lag table and long-form lag profile for every coin with price data."""
+    cube = score_cube(comments_source, scheme)
+    coins, _, score_gradient, price_gradient = correlation.gradient_matrices(
+        cube, load_prices(prices_source), start_date, end_date, score_type)
+    profile, overlap = correlation.lag_profile(score_gradient, price_gradient, max_lag)
+    table = correlation.lead_lag_table(coins, profile, overlap, max_lag)
+    profile = correlation.profile_frame(coins, profile, overlap, max_lag)
+    return table, profile[profile['Coin'].isin(table['Coin'])]
@@ -0,0 +1,312 @@
+"""Local sentiment classification of raw Reddit comments.
+
+Reads comment rows with the schema of r_CryptoCurrency_classified_sample.csv,
+labels every comment with a crypto-aware word lexicon and writes the four
+columns of r_CryptoCurrency_classified_compressed.csv that the dashboard and
+ingest.py consume:
+
+    python classify.py comments.csv --output incoming/comments.csv
+    python classify.py r_CryptoCurrency_classified_sample.csv --evaluate
+
+Comments with lexicon evidence are Positive or Negative. Comments without any
+lexicon word are Neutral with confidence 0: they still count in the Popularity
+Score, and the Sentiment Score weights them 0 instead of guessing a side. The
+upstream labels are binary and come from a much stronger model, so
+--evaluate prints the confusion matrix and agreement against a labeled file.
+
+The input is streamed in chunks and every chunk is split into batches for a
+process pool, so memory stays bounded and all cores are used. Results are
+cached by comment_id in a SQLite file; comments classified by the same
+lexicon on an earlier run are taken from the cache instead of being scored
+again. Everything runs on the CPU without network access or model downloads.
+"""
+import argparse
+import collections
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from ingest import COLUMNS, INCOMING_DIR
+
+CACHE_PATH = 'sentiment_cache.sqlite'
+
+CHUNK_ROWS = 50_000
+BATCH_ROWS = 5_000
+# chunks read ahead while earlier ones are still being classified
+IN_FLIGHT_CHUNKS = 2
+
+INPUT_COLUMNS = ['comment_id', 'comment_body', 'cleaned_comment_body', 'comment_score', 'comment_created_utc',
+                 'created_utc', 'labeled_submission']
+
+LEXICON = {
+    # market and price action
+    'moon': 2.0, 'mooning': 2.5, 'moons': 1.5, 'pump': 1.0, 'pumping': 1.5, 'rally': 2.0, 'rallying': 2.0,
+    'surge': 2.0, 'surging': 2.0, 'soar': 2.0, 'soaring': 2.5, 'breakout': 1.5, 'ath': 2.0, 'gain': 1.5,
+    'gains': 1.5, 'profit': 1.5, 'profits': 1.5, 'profitable': 1.5, 'bull': 1.5, 'bullish': 2.5, 'bullrun': 2.0,
+    'recover': 1.0, 'recovery': 1.5, 'rebound': 1.5, 'green': 1.0, 'up': 0.5, 'higher': 0.5, 'rise': 1.0,
+    'rising': 1.0, 'hodl': 1.0, 'hold': 0.5, 'holding': 0.5, 'accumulate': 1.0, 'accumulating': 1.0,
+    'adoption': 1.5, 'undervalued': 1.5, 'cheap': 0.5, 'lambo': 1.5, 'wagmi': 2.0, 'gm': 0.5,
+    'dump': -1.5, 'dumping': -2.0, 'dumped': -1.5, 'crash': -2.5, 'crashing': -2.5, 'crashed': -2.5,
+    'plunge': -2.5, 'plunging': -2.5, 'tank': -2.0, 'tanking': -2.0, 'tanked': -2.0, 'drop': -1.0,
+    'dropping': -1.5, 'dropped': -1.0, 'dip': -0.5, 'bear': -1.5, 'bearish': -2.5, 'red': -1.0, 'down': -0.5,
+    'lower': -0.5, 'loss': -2.0, 'losses': -2.0, 'lose': -1.5, 'losing': -1.5, 'lost': -1.5, 'rekt': -2.5,
+    'liquidated': -2.5, 'liquidation': -2.0, 'overvalued': -1.5, 'bubble': -1.5, 'capitulation': -2.0,
+    'ngmi': -2.0, 'fud': -1.5, 'fomo': -0.5, 'bagholder': -1.5, 'bagholders': -1.5, 'correction': -1.0,
+    # trust and risk
+    'scam': -3.0, 'scams': -3.0, 'scammer': -3.0, 'scammers': -3.0, 'scammed': -3.0, 'fraud': -3.0,
+    'fraudulent': -3.0, 'ponzi': -3.0, 'rug': -2.5, 'rugpull': -3.0, 'rugged': -3.0, 'hack': -2.5,
+    'hacked': -3.0, 'exploit': -2.0, 'exploited': -2.5, 'stolen': -2.5, 'theft': -2.5, 'shitcoin': -2.0,
+    'shitcoins': -2.0, 'worthless': -2.5, 'useless': -2.0, 'risky': -1.0, 'risk': -0.5, 'unreliable': -1.5,
+    'manipulation': -2.0, 'manipulated': -2.0, 'bankrupt': -2.5, 'bankruptcy': -2.5, 'ban': -1.5, 'banned': -1.5,
+    'crackdown': -2.0, 'lawsuit': -1.5, 'sec': -0.5, 'volatile': -0.5, 'volatility': -0.5,
+    'secure': 1.5, 'safe': 1.0, 'legit': 1.5, 'solid': 1.5, 'reliable': 1.5, 'trust': 1.0, 'trusted': 1.5,
+    'approved': 1.5, 'approval': 1.5, 'etf': 0.5, 'partnership': 1.0, 'upgrade': 1.0, 'innovation': 1.5,
+    'innovative': 1.5, 'potential': 1.0, 'promising': 2.0, 'opportunity': 1.5, 'future': 0.5,
+    # general opinion words
+    'good': 1.5, 'great': 2.5, 'excellent': 3.0, 'amazing': 3.0, 'awesome': 3.0, 'best': 2.5, 'better': 1.5,
+    'love': 2.5, 'like': 0.5, 'happy': 2.0, 'glad': 1.5, 'nice': 1.5, 'cool': 1.0, 'win': 2.0, 'winning': 2.0,
+    'won': 1.5, 'strong': 1.5, 'stronger': 1.5, 'smart': 1.5, 'right': 0.5, 'agree': 1.0, 'thanks': 1.5,
+    'thank': 1.5, 'congrats': 2.0, 'lucky': 1.5, 'easy': 1.0, 'free': 0.5, 'interesting': 1.0, 'useful': 1.5,
+    'bad': -2.0, 'worse': -2.0, 'worst': -3.0, 'terrible': -3.0, 'awful': -3.0, 'horrible': -3.0, 'hate': -2.5,
+    'stupid': -2.0, 'dumb': -2.0, 'idiot': -2.5, 'idiots': -2.5, 'wrong': -1.5, 'fail': -2.0, 'failed': -2.0,
+    'failing': -2.0, 'failure': -2.0, 'weak': -1.5, 'fear': -1.5, 'scared': -1.5, 'panic': -2.0, 'worry': -1.0,
+    'worried': -1.5, 'problem': -1.0, 'problems': -1.0, 'sad': -2.0, 'pain': -1.5, 'painful': -2.0,
+    'broke': -1.5, 'poor': -1.5, 'ugly': -2.0, 'garbage': -2.5, 'trash': -2.5, 'joke': -1.5, 'lol': 0.5,
+    'regret': -2.0, 'sucks': -2.0, 'dead': -2.0, 'die': -2.0, 'dying': -2.0, 'kill': -1.5, 'killed': -1.5,
+    'crazy': -0.5, 'greed': -1.0, 'greedy': -1.5, 'unfortunately': -1.5, 'sorry': -0.5,
+    # emoji
+    '🚀': 2.0, '🌙': 1.5, '📈': 1.5, '💎': 1.0, '🔥': 1.0, '💪': 1.5, '🐂': 1.5, '😀': 1.5, '😂': 0.5,
+    '📉': -1.5, '💩': -2.0, '🐻': -1.5, '😭': -1.5, '😢': -1.5, '🤡': -1.5, '💀': -1.0,
+}
+
+NEGATIONS = {
+    'not', 'no', 'never', 'nothing', 'nobody', 'none', 'neither', 'nor', 'without', 'hardly', 'barely',
+    "don't", 'dont', "doesn't", 'doesnt', "didn't", 'didnt', "isn't", 'isnt', "aren't", 'arent', "wasn't",
+    'wasnt', "weren't", 'werent', "won't", 'wont', "can't", 'cant', 'cannot', "couldn't", 'couldnt',
+    "shouldn't", 'shouldnt', "wouldn't", 'wouldnt', "ain't", 'aint',
+}
+# a negation flips and dampens the polarity of the next few words, as in VADER
+NEGATION_WINDOW = 3
+NEGATION_SCALE = -0.75
+# squashes the summed word polarity into (-1, 1)
+NORMALIZATION_ALPHA = 15
+# label of texts without lexicon evidence, weighted 0 in the Sentiment Score
+UNDECIDED_SENTIMENT = 'Neutral'
+
+TOKEN_PATTERN = "[a-z][a-z']*|[" + ''.join(word for word in LEXICON if not word.isascii()) + "]"
+
+# cached results are only reused while the lexicon and its parameters stay the same
+CLASSIFIER = 'lexicon-' + hashlib.sha1(json.dumps(
+    [sorted(LEXICON.items()), sorted(NEGATIONS), NEGATION_WINDOW, NEGATION_SCALE, NORMALIZATION_ALPHA,
+     UNDECIDED_SENTIMENT],
+    ensure_ascii=False).encode()).hexdigest()[:12]
+
+
+def polarity_scores(texts):
+    """Normalized lexicon polarity in (-1, 1) of every text, aligned to the index of texts."""
+    tokens = texts.fillna('').astype(str).str.lower().str.findall(TOKEN_PATTERN).explode()
+    weights = tokens.map(LEXICON).fillna(0.0).to_numpy(dtype=float, copy=True)
+
+    # tokens of one text share its index label, so shifts only look back within the same text
+    rows = tokens.index.to_numpy()
+    is_negation = tokens.isin(NEGATIONS).to_numpy()
+    negated = np.zeros(len(tokens), dtype=bool)
+    for distance in range(1, NEGATION_WINDOW + 1):
+        negated[distance:] |= is_negation[:-distance] & (rows[distance:] == rows[:-distance])
+    weights[negated] *= NEGATION_SCALE
+
+    totals = pd.Series(weights, index=tokens.index).groupby(level=0, sort=False).sum()
+    totals = totals.reindex(texts.index, fill_value=0.0)
+    return totals / np.sqrt(totals ** 2 + NORMALIZATION_ALPHA)
+
+
+def classify_texts(texts):
+    """Sentiment and confidence of every text; texts without lexicon evidence get UNDECIDED_SENTIMENT."""
+    scores = polarity_scores(texts)
+    return pd.DataFrame({
+        'Sentiment': np.select([scores > 0, scores < 0], ['Positive', 'Negative'], UNDECIDED_SENTIMENT),
+        'confidence': scores.abs().to_numpy(),
+    }, index=texts.index)
+
+
+class SentimentCache:
+    """Classifications keyed by comment_id in a SQLite file."""
+
+    def __init__(self, path=CACHE_PATH, classifier=CLASSIFIER):
+        self.classifier = classifier
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS sentiments '
+            '(comment_id TEXT PRIMARY KEY, classifier TEXT, Sentiment TEXT, confidence REAL)')
+        self.connection.execute('CREATE TEMP TABLE lookup (comment_id TEXT PRIMARY KEY)')
+
+    def lookup(self, comment_ids):
+        """Cached Sentiment and confidence of the given ids that this classifier has seen, indexed by comment_id."""
+        with self.connection:
+            self.connection.execute('DELETE FROM lookup')
+            self.connection.executemany('INSERT OR IGNORE INTO lookup VALUES (?)',
+                                        ((comment_id,) for comment_id in comment_ids.dropna().unique()))
+        return pd.read_sql_query(
+            'SELECT comment_id, Sentiment, confidence FROM sentiments JOIN lookup USING (comment_id) '
+            'WHERE classifier = ?', self.connection, params=(self.classifier,), index_col='comment_id')
+
+    def store(self, results):
+        """Save rows with comment_id, Sentiment and confidence columns."""
+        results = results.dropna(subset=['comment_id'])
+        with self.connection:
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO sentiments VALUES (?, ?, ?, ?)',
+                zip(results['comment_id'], [self.classifier] * len(results), results['Sentiment'],
+                    results['confidence'].astype(float)))
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+
+def read_chunks(path, chunksize=CHUNK_ROWS, extra_columns=()):
+    """Comment rows in chunks, with the text to classify in 'text' and the timestamp in 'created_utc'."""
+    columns = set(INPUT_COLUMNS) | set(extra_columns)
+    reader = pd.read_csv(path, usecols=lambda column: column in columns, chunksize=chunksize,
+                         dtype={'comment_id': str, 'comment_created_utc': str, 'created_utc': str})
+    for chunk in reader:
+        missing = [column for column in ['comment_id', *extra_columns] if column not in chunk.columns]
+        if missing:
+            raise ValueError(f"{path} is missing the columns {missing}.")
+        # the raw body keeps negations and emoji that the cleaned body has lost
+        text_columns = [column for column in ('comment_body', 'cleaned_comment_body') if column in chunk.columns]
+        if not text_columns:
+            raise ValueError(f"{path} has neither a comment_body nor a cleaned_comment_body column.")
+        text = chunk[text_columns[0]]
+        for column in text_columns[1:]:
+            text = text.fillna(chunk[column])
+        # created_utc of the sample is the submission time, the dashboard plots comment times
+        if 'comment_created_utc' in chunk.columns:
+            chunk['created_utc'] = chunk['comment_created_utc']
+        yield chunk.assign(text=text)
+
+
+def _submit(pool, cache, chunk, batch_rows):
+    cached = chunk[['comment_id']].join(cache.lookup(chunk['comment_id']), on='comment_id', how='inner')
+    pending = chunk.loc[~chunk.index.isin(cached.index), 'text']
+    futures = [pool.submit(classify_texts, pending.iloc[start:start + batch_rows])
+               for start in range(0, len(pending), batch_rows)]
+    return chunk, cached, futures
+
+
+def _collect(cache, chunk, cached, futures):
+    classified = [future.result() for future in futures]
+    if classified:
+        classified = pd.concat(classified)
+        cache.store(classified.assign(comment_id=chunk.loc[classified.index, 'comment_id']))
+    else:
+        classified = cached.iloc[:0]
+    results = pd.concat([cached[['Sentiment', 'confidence']], classified]).reindex(chunk.index)
+    return chunk.assign(Sentiment=results['Sentiment'], confidence=results['confidence']), len(cached)
+
+
+def classify_file(input_path, output_path, cache_path=CACHE_PATH, chunksize=CHUNK_ROWS, batch_rows=BATCH_ROWS,
+                  workers=None, confidence=False):
+    """Classify the comments of input_path and write them as a compact CSV file.
+
+    The output is written next to output_path first and moved into place when
+    complete, so a watching ingest.py never picks up a partial file. Returns
+    the number of rows written and how many of them came from the cache.
+    """
+    columns = COLUMNS + ['confidence'] if confidence else COLUMNS
+    temporary = output_path + '.tmp'
+    if os.path.dirname(output_path):
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    stats = {'rows': 0, 'cached': 0}
+
+    def write(chunk, cached):
+        chunk[columns].to_csv(temporary, mode='a' if stats['rows'] else 'w', header=not stats['rows'], index=False)
+        stats['rows'] += len(chunk)
+        stats['cached'] += cached
+
+    with SentimentCache(cache_path) as cache, ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = collections.deque()
+        for chunk in read_chunks(input_path, chunksize):
+            pending.append(_submit(pool, cache, chunk, batch_rows))
+            if len(pending) > IN_FLIGHT_CHUNKS:
+                write(*_collect(cache, *pending.popleft()))
+        while pending:
+            write(*_collect(cache, *pending.popleft()))
+
+    if not stats['rows']:
+        pd.DataFrame(columns=columns).to_csv(temporary, index=False)
+    os.replace(temporary, output_path)
+    return stats
+
+
+def evaluate(path, chunksize=CHUNK_ROWS):
+    """Confusion matrix of the lexicon against the Sentiment column of a labeled file, e.g. the sample.
+
+    Rows are the file's labels and columns the lexicon's.
+    """
+    confusion = pd.DataFrame()
+    for chunk in read_chunks(path, chunksize, extra_columns=['Sentiment']):
+        labeled = chunk[chunk['Sentiment'].notna()]
+        counts = pd.crosstab(labeled['Sentiment'], classify_texts(labeled['text'])['Sentiment'])
+        confusion = confusion.add(counts, fill_value=0)
+    return confusion.fillna(0).astype(int).rename_axis(index='labeled', columns='lexicon')
+
+
+def agreement(confusion):
+    """Share of rows the lexicon labels like the file, and the share of the file's majority class."""
+    total = confusion.to_numpy().sum()
+    matching = sum(confusion.at[label, label] for label in confusion.index if label in confusion.columns)
+    return matching / total, confusion.sum(axis=1).max() / total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Classify the sentiment of raw comments with a local lexicon.")
+    parser.add_argument('input', help="a CSV file with the schema of r_CryptoCurrency_classified_sample.csv")
+    parser.add_argument('--output', help="defaults to a new time-stamped file in the ingest incoming directory")
+    parser.add_argument('--cache', default=CACHE_PATH, help="SQLite file of earlier classifications")
+    parser.add_argument('--chunksize', type=int, default=CHUNK_ROWS, help="rows read from the input at a time")
+    parser.add_argument('--batch', type=int, default=BATCH_ROWS, help="rows per process pool task")
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--confidence', action='store_true',
+                        help="also write a confidence column for the Confidence-weighted scheme")
+    parser.add_argument('--evaluate', action='store_true',
+                        help="compare with the Sentiment column of the input instead of writing output")
+    args = parser.parse_args()
+
+    if args.evaluate:
+        confusion = evaluate(args.input, args.chunksize)
+        matching, majority = agreement(confusion)
+        print(confusion.to_string())
+        print(f"agreement {matching:.1%} of {confusion.to_numpy().sum()} rows, "
+              f"always answering the majority class {majority:.1%}")
+        decided = confusion.drop(columns=UNDECIDED_SENTIMENT, errors='ignore')
+        if decided.to_numpy().sum():
+            print(f"agreement {agreement(decided)[0]:.1%} of the {decided.to_numpy().sum()} rows with lexicon evidence")
+        return
+
+    if args.output is None:
+        # one file per run, so runs never overwrite each other's batches in the incoming directory
+        args.output = os.path.join(INCOMING_DIR, f"classified-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.csv")
+
+    start = time.perf_counter()
+    stats = classify_file(args.input, args.output, args.cache, args.chunksize, args.batch, args.workers,
+                          args.confidence)
+    seconds = time.perf_counter() - start
+    print(f"wrote {stats['rows']} rows to {args.output} in {seconds:.2f}s, "
+          f"{stats['cached']} from the cache and {stats['rows'] - stats['cached']} classified")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""Lead/lag cross-correlation of score and price gradients for all coins at once.
+
+Every *_price column of the price table is a coin. Its score gradient comes
+from the score cube and its price gradient from the price table, both on one
+grid of calendar buckets. A bucket counts only if it has comments and a known
+price; every other bucket is a missing value, not a zero, so no gradient spans
+a gap. analytics.add_gradients uses the same definition, so the lagged
+correlations of a single label in the dashboard equal this engine's at the
+same lag. A positive lag k correlates the score gradient k buckets earlier
+with the current price gradient, i.e. sentiment leading price.
+"""
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from aggregates import SCORE_WEIGHTS
+from resample import align_prices
+
+MAX_LAG = 7
+# fewer overlapping days give correlations near +-1 by chance
+MIN_OVERLAP = 10
+
+
+def price_coins(daily_prices):
+    return [column[:-len('_price')] for column in daily_prices.columns if column.endswith('_price')]
+
+
+def gradient_matrices(cube, daily_prices, start_date, end_date, score_type='Sentiment Score'):
+    """Score and price gradients as (coins, buckets) arrays on the cube's time grid."""
+    coins = price_coins(daily_prices)
+    window = cube.day_slice(start_date, end_date)
+    buckets = cube.buckets[window]
+
+    rows = cube.labels.get_indexer(coins)
+    scores = np.full((len(coins), len(buckets)), np.nan)
+    known = rows >= 0
+    scores[known] = cube.values[rows[known], window, :] @ SCORE_WEIGHTS[score_type]
+    scores[known] = np.where(cube.counts[rows[known], window] > 0, scores[known], np.nan)
+
+    prices = align_prices(daily_prices, buckets, cube.freq)[[f"{coin}_price" for coin in coins]]
+    prices = prices.to_numpy(dtype=float).T
+    missing = ~(np.isfinite(scores) & np.isfinite(prices))
+    scores[missing] = np.nan
+    prices[missing] = np.nan
+
+    return coins, buckets[1:], np.diff(scores, axis=1), np.diff(prices, axis=1)
+
+
+def lag_profile(x, y, max_lag=MAX_LAG, min_overlap=MIN_OVERLAP):
+    """Pearson correlation of x shifted by every lag in -max_lag..max_lag against y.
+
+    x and y have shape (series, days) and may contain NaN. Returns the
+    correlations and the number of overlapping days behind each, both arrays
+    of shape (series, 2 * max_lag + 1) whose column j holds lag j - max_lag.
+    Correlations over fewer than min_overlap days are NaN.
+    """
+    n_series, n_days = x.shape
+    padding = np.full((n_series, max_lag), np.nan)
+    padded = np.concatenate([padding, x, padding], axis=1)
+    # window j is x delayed by max_lag - j days, reversed so column i is lag i - max_lag
+    shifted = sliding_window_view(padded, n_days, axis=1)[:, ::-1, :]
+    y = y[:, None, :]
+
+    mask = np.isfinite(shifted) & np.isfinite(y)
+    overlap = mask.sum(axis=2)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        x_mean = np.where(mask, shifted, 0).sum(axis=2) / overlap
+        y_mean = np.where(mask, y, 0).sum(axis=2) / overlap
+        dx = np.where(mask, shifted - x_mean[..., None], 0)
+        dy = np.where(mask, y - y_mean[..., None], 0)
+        corr = (dx * dy).sum(axis=2) / np.sqrt((dx * dx).sum(axis=2) * (dy * dy).sum(axis=2))
+    corr[overlap < min_overlap] = np.nan
+    return corr, overlap
+
+
+def lead_lag_table(coins, profile, overlap, max_lag=MAX_LAG):
+    """Rank coins by how strongly their score gradient leads the price gradient."""
+    lags = np.arange(-max_lag, max_lag + 1)
+    strength = np.where(np.isfinite(profile), np.abs(profile), -1.0)
+    leading = lags > 0
+
+    best = strength.argmax(axis=1)
+    best_leading = np.flatnonzero(leading)[strength[:, leading].argmax(axis=1)]
+    rows = np.arange(len(coins))
+    table = pd.DataFrame({
+        'Coin': coins,
+        'Leading Lag': lags[best_leading],
+        'Leading Corr.': profile[rows, best_leading],
+        'Leading Overlap': overlap[rows, best_leading],
+        'Best Lag': lags[best],
+        'Best Corr.': profile[rows, best],
+        'Best Overlap': overlap[rows, best],
+    })
+    table = table[np.isfinite(profile).any(axis=1)]
+    order = table['Leading Corr.'].abs().sort_values(ascending=False, na_position='last').index
+    return table.loc[order].reset_index(drop=True)
+
+
+def profile_frame(coins, profile, overlap, max_lag=MAX_LAG):
+    """Long-form (coin, lag, correlation, overlap) rows, e.g. for a heatmap."""
+    lags = np.arange(-max_lag, max_lag + 1)
+    return pd.DataFrame({
+        'Coin': np.repeat(coins, len(lags)),
+        'Lag': np.tile(lags, len(coins)),
+        'Correlation': profile.ravel(),
+        'Overlap': overlap.ravel(),
+    })
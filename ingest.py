@@ -0,0 +1,263 @@
+"""Incremental ingestion of classified comments.
+
+New batches are dropped into an incoming directory as CSV or Parquet files
+with the schema of r_CryptoCurrency_classified_compressed.csv. Each batch is
+appended to an on-disk store partitioned by calendar day:
+
+    store/comments/day=2024-12-05/<batch>.parquet    raw rows of the batch
+    store/aggregates/day=2024-12-05.parquet          summed scores per (label, sentiment)
+
+Only the day partitions a batch touches are rewritten, so the cost of a batch
+grows with its size and not with the stored history. Every aggregate partition
+records the ids of the batches folded into it, so a batch that is ingested
+again, for example after a crash before its file was moved away, is skipped.
+The dashboard keeps running daily cubes and replaces only the day slices of
+partitions that changed.
+
+    python ingest.py --incoming incoming --store store          # keep watching
+    python ingest.py --incoming incoming --store store --once   # drain and exit
+"""
+import argparse
+import glob
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from aggregates import RunningScoreCube
+from scoring import SENTIMENTS, WEIGHTING_SCHEMES, sentiment_codes
+
+COLUMNS = ['comment_score', 'created_utc', 'labeled_submission', 'Sentiment']
+
+INCOMING_DIR = 'incoming'
+STORE_DIR = 'store'
+
+BATCH_PATTERNS = ('*.csv', '*.parquet')
+
+logger = logging.getLogger('ingest')
+
+# parquet schema metadata key listing the batches summed into an aggregate partition
+BATCHES_KEY = b'ingested_batches'
+
+
+def comments_dir(store_dir):
+    return os.path.join(store_dir, 'comments')
+
+
+def aggregates_dir(store_dir):
+    return os.path.join(store_dir, 'aggregates')
+
+
+def has_store(store_dir=STORE_DIR):
+    return bool(glob.glob(os.path.join(aggregates_dir(store_dir), '*.parquet')))
+
+
+def read_batch(path):
+    if path.endswith('.parquet'):
+        return pd.read_parquet(path)
+    return pd.read_csv(path)
+
+
+def prepare_batch(batch):
+    missing = [column for column in COLUMNS if column not in batch.columns]
+    if missing:
+        raise ValueError(f"Batch is missing the columns {missing}.")
+    batch = batch.copy()
+    if not pd.api.types.is_datetime64_any_dtype(batch['created_utc']):
+        batch['created_utc'] = pd.to_datetime(batch['created_utc'], dayfirst=True, errors='coerce')
+    batch = batch[batch['created_utc'].notna() & batch['labeled_submission'].notna()]
+    batch['labeled_submission'] = batch['labeled_submission'].astype(str)
+    batch['Sentiment'] = pd.Categorical.from_codes(sentiment_codes(batch['Sentiment']), categories=SENTIMENTS)
+    return batch
+
+
+def aggregate_batch(batch):
+    """Sum every weighting scheme the batch supports per (label, day, sentiment)."""
+    sums = pd.DataFrame({
+        'labeled_submission': batch['labeled_submission'].to_numpy(),
+        'day': batch['created_utc'].dt.floor('D').to_numpy(),
+        'Sentiment': batch['Sentiment'].astype(str).to_numpy(),
+        'count': 1,
+    })
+    for scheme, magnitude in WEIGHTING_SCHEMES.items():
+        try:
+            sums[scheme] = magnitude(batch)
+        except ValueError:
+            continue
+    return sums.groupby(['labeled_submission', 'day', 'Sentiment'], as_index=False, sort=False).sum()
+
+
+def batch_id_for(path):
+    """Id of a dropped file: its name plus its mtime, so a new file under a reused name is a new batch."""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return f"{stem}-{os.stat(path).st_mtime_ns}"
+
+
+def partition_day(path):
+    # aggregate partitions are named day=YYYY-MM-DD.parquet
+    return pd.Timestamp(os.path.splitext(os.path.basename(path))[0].split('=', 1)[1])
+
+
+def ingested_batches(path):
+    metadata = pq.read_schema(path).metadata or {}
+    return json.loads(metadata.get(BATCHES_KEY, b'[]'))
+
+
+def _write_atomic(frame, path, batches=None):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temporary = path + '.tmp'
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    if batches is not None:
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), BATCHES_KEY: json.dumps(batches).encode()})
+    pq.write_table(table, temporary)
+    os.replace(temporary, path)
+
+
+def ingest_batch(batch, store_dir=STORE_DIR, batch_id=None):
+    """Append a batch to the store and fold it into the touched daily aggregates.
+
+    Raw rows are written under the batch id, so re-ingesting a batch rewrites
+    them, and day aggregates that already list the batch id are left alone.
+    """
+    batch = prepare_batch(batch)
+    batch_id = batch_id or f"batch-{time.time_ns()}"
+    sums = aggregate_batch(batch)
+
+    batch_days = batch['created_utc'].dt.strftime('%Y-%m-%d')
+    for day, rows in batch.groupby(batch_days, sort=False):
+        _write_atomic(rows[COLUMNS], os.path.join(comments_dir(store_dir), f"day={day}", f"{batch_id}.parquet"))
+
+    for day, day_sums in sums.groupby(sums['day'].dt.strftime('%Y-%m-%d'), sort=False):
+        path = os.path.join(aggregates_dir(store_dir), f"day={day}.parquet")
+        batches = []
+        if os.path.exists(path):
+            batches = ingested_batches(path)
+            if batch_id in batches:
+                continue
+            existing = pd.read_parquet(path)
+            # a scheme stays only while every batch of the day carried it, so no sum covers part of the rows
+            shared = [column for column in day_sums.columns if column in existing.columns]
+            day_sums = pd.concat([existing[shared], day_sums[shared]], ignore_index=True)
+            day_sums = day_sums.groupby(['labeled_submission', 'day', 'Sentiment'], as_index=False, sort=False).sum()
+        _write_atomic(day_sums, path, batches + [batch_id])
+    return len(batch)
+
+
+def _move(path, directory):
+    os.makedirs(directory, exist_ok=True)
+    shutil.move(path, os.path.join(directory, os.path.basename(path)))
+
+
+def ingest_pending(incoming_dir=INCOMING_DIR, store_dir=STORE_DIR):
+    """Ingest every batch file in incoming_dir, oldest first, and move it to incoming_dir/processed.
+
+    A file that cannot be read or ingested is logged and moved to
+    incoming_dir/failed, so it does not block the files behind it.
+    """
+    paths = [path for pattern in BATCH_PATTERNS for path in glob.glob(os.path.join(incoming_dir, pattern))]
+    ingested = 0
+    for path in sorted(paths, key=os.path.getmtime):
+        try:
+            ingested += ingest_batch(read_batch(path), store_dir, batch_id_for(path))
+        except Exception as error:
+            logger.error("could not ingest %s, moved to failed/: %s", path, error)
+            _move(path, os.path.join(incoming_dir, 'failed'))
+            continue
+        _move(path, os.path.join(incoming_dir, 'processed'))
+    return ingested
+
+
+def watch(incoming_dir=INCOMING_DIR, store_dir=STORE_DIR, interval=5.0):
+    while True:
+        ingested = ingest_pending(incoming_dir, store_dir)
+        if ingested:
+            print(f"ingested {ingested} rows")
+        time.sleep(interval)
+
+
+class DailyAggregates:
+    """Running daily score cubes over the aggregate partitions.
+
+    refresh() re-reads only the day partitions that are new or were rewritten
+    and replaces their day slices in one RunningScoreCube per scheme, so a
+    rerun after an ingest costs the changed days and not the whole history.
+    cube() hands out one copy per scheme and version, taken under the lock, so
+    no session reads a day while another session's refresh rewrites it.
+    """
+
+    def __init__(self, store_dir=STORE_DIR):
+        self.store_dir = store_dir
+        self.version = 0
+        # path -> (mtime, schemes the partition carries)
+        self._partitions = {}
+        self._cubes = {scheme: RunningScoreCube(scheme) for scheme in WEIGHTING_SCHEMES}
+        # scheme -> ScoreCube copy of the current version, handed to every session
+        self._snapshots = {}
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """Fold new, rewritten or removed day partitions into the cubes and return the current version."""
+        with self._lock:
+            paths = glob.glob(os.path.join(aggregates_dir(self.store_dir), '*.parquet'))
+            changed = False
+            for path in set(self._partitions) - set(paths):
+                for cube in self._cubes.values():
+                    cube.clear_day(partition_day(path))
+                del self._partitions[path]
+                changed = True
+            for path in paths:
+                mtime = os.path.getmtime(path)
+                if path not in self._partitions or self._partitions[path][0] != mtime:
+                    sums = pd.read_parquet(path)
+                    for scheme, cube in self._cubes.items():
+                        if scheme in sums.columns:
+                            cube.set_day(partition_day(path), sums)
+                        else:
+                            cube.clear_day(partition_day(path))
+                    self._partitions[path] = (mtime, set(sums.columns) & set(WEIGHTING_SCHEMES))
+                    changed = True
+            if changed or not self.version:
+                self._snapshots = {}
+                # wall-clock based so a re-created reader never reuses an old cache key
+                self.version = time.time_ns()
+            return self.version
+
+    def schemes(self):
+        """Weighting schemes carried by every day partition; a cube for any other would miss days."""
+        with self._lock:
+            partitions = [schemes for _, schemes in self._partitions.values()]
+        return [scheme for scheme in WEIGHTING_SCHEMES
+                if partitions and all(scheme in schemes for schemes in partitions)]
+
+    def cube(self, scheme='Raw'):
+        if scheme not in self.schemes():
+            raise ValueError(f"Not every day in the store has {scheme} scores.")
+        with self._lock:
+            if scheme not in self._snapshots:
+                self._snapshots[scheme] = self._cubes[scheme].cube()
+            return self._snapshots[scheme]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Append dropped batches of classified comments to the day-partitioned store.")
+    parser.add_argument('--incoming', default=INCOMING_DIR)
+    parser.add_argument('--store', default=STORE_DIR)
+    parser.add_argument('--interval', type=float, default=5.0, help="seconds between directory scans")
+    parser.add_argument('--once', action='store_true', help="ingest what is pending and exit")
+    args = parser.parse_args()
+    logging.basicConfig(format='%(asctime)s %(name)s %(levelname)s %(message)s')
+
+    if args.once:
+        print(f"ingested {ingest_pending(args.incoming, args.store)} rows")
+    else:
+        watch(args.incoming, args.store, args.interval)
+
+
+if __name__ == '__main__':
+    main()
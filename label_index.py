@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+
+ONE_DAY = pd.Timedelta(days=1)
+
+
+class LabelIndex:
+    """Comment rows sorted by (labeled_submission, created_utc) with per-label offsets.
+
+    Rows of one label are contiguous and in time order, so a label's date
+    window is found with two binary searches and returned as a slice of the
+    sorted frame instead of a boolean scan over the whole table.
+    """
+
+    def __init__(self, data):
+        data = data[data['created_utc'].notna() & data['labeled_submission'].notna()]
+        label_codes, labels = pd.factorize(data['labeled_submission'])
+        times = data['created_utc'].to_numpy(dtype='datetime64[ns]')
+        order = np.lexsort((times, label_codes))
+
+        self.labels = pd.Index(np.asarray(labels))
+        self.frame = data.take(order).reset_index(drop=True)
+        self.times = times[order]
+        self.offsets = np.concatenate([[0], np.cumsum(np.bincount(label_codes, minlength=len(labels)))])
+
+    def __len__(self):
+        return len(self.frame)
+
+    def label_slice(self, label):
+        if label not in self.labels:
+            return slice(0, 0)
+        row = self.labels.get_loc(label)
+        return slice(int(self.offsets[row]), int(self.offsets[row + 1]))
+
+    def window_slice(self, label, start_date, end_date):
+        # both ends are inclusive calendar days, as in ScoreCube.day_slice
+        rows = self.label_slice(label)
+        times = self.times[rows]
+        start = times.searchsorted(np.datetime64(pd.Timestamp(start_date).floor('D')), side='left')
+        stop = times.searchsorted(np.datetime64(pd.Timestamp(end_date).floor('D') + ONE_DAY), side='left')
+        return slice(rows.start + int(start), rows.start + int(stop))
+
+    def label_rows(self, label):
+        return self.frame.iloc[self.label_slice(label)]
+
+    def window(self, label, start_date, end_date):
+        """Rows of label within the date window, a slice of the sorted frame without copying."""
+        return self.frame.iloc[self.window_slice(label, start_date, end_date)]
@@ -0,0 +1,127 @@
+"""Per-stage timing, peak memory and row counts for a dashboard rerun.
+
+    profiler = Profiler(enabled=True)
+    with profiler.stage('top10', rows_in=len(data)) as stage:
+        scores = ...
+        stage.rows_out = len(scores)
+
+Every finished stage is kept in profiler.records and written as one JSON log
+line at INFO level to the 'profiling' logger. The module adds no handlers, so
+the lines go wherever the application's logging configuration routes them;
+app.py calls configure_logging() to print them to stderr by default. A
+disabled profiler hands out a shared no-op stage, so instrumented code costs a
+method call when profiling is off.
+
+Peak memory comes from tracemalloc and is relative to the allocations alive
+when the stage started. tracemalloc only runs while at least one stage is
+open. It is process wide, so stages should not be nested, and peaks of stages
+that overlap in concurrent sessions are approximate.
+"""
+import json
+import logging
+import threading
+import time
+import tracemalloc
+
+import pandas as pd
+
+# handlers and levels are left to the entry point, see configure_logging()
+logger = logging.getLogger('profiling')
+
+
+def configure_logging():
+    """Show the stage lines on stderr unless logging was already configured.
+
+    logging.basicConfig does nothing when the root logger has handlers, and the
+    level is only set when no configuration set one for the 'profiling' logger.
+    """
+    logging.basicConfig(format='%(asctime)s %(name)s %(message)s')
+    if logger.level == logging.NOTSET:
+        logger.setLevel(logging.INFO)
+
+_open_stages = 0
+_tracing_lock = threading.Lock()
+
+
+def _start_tracing():
+    global _open_stages
+    with _tracing_lock:
+        if _open_stages == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        _open_stages += 1
+        tracemalloc.reset_peak()
+        return tracemalloc.get_traced_memory()[0]
+
+
+def _stop_tracing():
+    global _open_stages
+    with _tracing_lock:
+        peak = tracemalloc.get_traced_memory()[1]
+        _open_stages -= 1
+        if _open_stages == 0:
+            tracemalloc.stop()
+        return peak
+
+
+class Stage:
+    def __init__(self, profiler, name, rows_in=None):
+        self.profiler = profiler
+        self.name = name
+        self.rows_in = rows_in
+        self.rows_out = None
+
+    def __enter__(self):
+        self._memory_start = _start_tracing()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        seconds = time.perf_counter() - self._start
+        peak = max(_stop_tracing() - self._memory_start, 0)
+        self.profiler.record({
+            'stage': self.name,
+            'seconds': seconds,
+            'peak_mb': peak / 2 ** 20,
+            'rows_in': self.rows_in,
+            'rows_out': self.rows_out,
+            'failed': exc_type is not None,
+        })
+        return False
+
+
+class _NullStage:
+    rows_in = rows_out = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+    def __setattr__(self, name, value):
+        # writes from instrumented code are dropped
+        pass
+
+
+NULL_STAGE = _NullStage()
+
+
+class Profiler:
+    def __init__(self, enabled=False, run_id=None):
+        self.enabled = enabled
+        self.run_id = run_id
+        self.records = []
+
+    def stage(self, name, rows_in=None):
+        if not self.enabled:
+            return NULL_STAGE
+        return Stage(self, name, rows_in)
+
+    def record(self, record):
+        self.records.append(record)
+        logger.info(json.dumps(dict(record, run_id=self.run_id)))
+
+    def frame(self):
+        frame = pd.DataFrame(self.records, columns=['stage', 'seconds', 'peak_mb', 'rows_in', 'rows_out', 'failed'])
+        frame['ms'] = frame['seconds'] * 1000
+        return frame[['stage', 'ms', 'peak_mb', 'rows_in', 'rows_out']]
@@ -0,0 +1,90 @@
+"""Time bucketing, price alignment and chart decimation for intraday resolutions."""
+import numpy as np
+import pandas as pd
+
+RESOLUTIONS = {
+    'Daily': '1D',
+    'Hourly': '1h',
+    '15 Minutes': '15min',
+    '5 Minutes': '5min',
+}
+
+# upper bound on the points a line chart sends to the browser
+MAX_CHART_POINTS = 1000
+
+
+def bucket_codes(timestamps, freq):
+    """Epoch-aligned integer bucket of every timestamp and the matching bucket start times.
+
+    Codes are relative to the first bucket, so they index straight into the
+    returned DatetimeIndex.
+    """
+    width = pd.Timedelta(freq).value
+    nanoseconds = timestamps.to_numpy(dtype='datetime64[ns]').view(np.int64)
+    if not len(nanoseconds):
+        return np.zeros(0, dtype=np.int64), pd.DatetimeIndex([])
+    codes = nanoseconds // width
+    first, last = codes.min(), codes.max()
+    starts = pd.DatetimeIndex(np.arange(first, last + 1, dtype=np.int64) * width)
+    return codes - first, starts
+
+
+def price_step(prices):
+    """Median interval between the dates of a price table, NaT with fewer than two rows."""
+    return prices['date'].sort_values().diff().median() if len(prices) > 1 else pd.NaT
+
+
+def price_freq(prices, freq):
+    """freq, or the interval of the price table if that is coarser.
+
+    Below the price interval every bucket carries the last price forward, so
+    price gradients would be zero in all but one bucket per price. Gradients
+    and correlations are computed at the returned width instead.
+    """
+    step = price_step(prices)
+    if pd.isna(step) or step <= pd.Timedelta(freq):
+        return freq
+    for unit, width in (('D', pd.Timedelta(days=1)), ('h', pd.Timedelta(hours=1)), ('min', pd.Timedelta(minutes=1))):
+        if step % width == pd.Timedelta(0):
+            return f"{step // width}{unit}"
+    return f"{int(step.total_seconds())}s"
+
+
+def align_prices(prices, buckets, freq):
+    """Last known price of every *_price column at the end of each bucket.
+
+    prices may be daily or finer. A price older than one bucket or one price
+    interval, whichever is longer, counts as missing.
+    """
+    prices = prices.sort_values('date')
+    bucket_ends = pd.DataFrame({'bucket_end': buckets + pd.Timedelta(freq) - pd.Timedelta(1, 'ns')})
+    step = price_step(prices)
+    tolerance = max(pd.Timedelta(freq), step if pd.notna(step) else pd.Timedelta(0))
+    aligned = pd.merge_asof(
+        bucket_ends, prices.astype({'date': 'datetime64[ns]'}), left_on='bucket_end', right_on='date',
+        direction='backward', tolerance=tolerance,
+    )
+    aligned['date'] = buckets
+    return aligned.drop(columns='bucket_end')
+
+
+def minmax_decimate(frame, columns, max_points=MAX_CHART_POINTS):
+    """Keep the minimum and maximum row of each column per chunk so spikes survive downsampling."""
+    columns = [columns] if isinstance(columns, str) else list(columns)
+    if len(frame) <= max_points:
+        return frame
+    chunks = max(max_points // (2 * len(columns)), 1)
+    size = -(-len(frame) // chunks)
+    offsets = np.arange(chunks) * size
+    keep = [np.array([0, len(frame) - 1])]
+    for column in columns:
+        values = np.full(chunks * size, np.nan)
+        values[:len(frame)] = frame[column].to_numpy(dtype=float)
+        values = values.reshape(chunks, size)
+        # chunks without any finite value fall back to their first row
+        filled = np.isfinite(values).any(axis=1)
+        values[~filled] = 0
+        keep.append(offsets + np.nanargmin(values, axis=1))
+        keep.append(offsets + np.nanargmax(values, axis=1))
+    keep = np.unique(np.concatenate(keep))
+    return frame.iloc[keep[keep < len(frame)]]
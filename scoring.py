@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+
+SENTIMENTS = ['Negative', 'Neutral', 'Positive']
+
+# +1/0/-1 weight per sentiment code, in SENTIMENTS order
+SENTIMENT_WEIGHTS = np.array([-1.0, 0.0, 1.0])
+
+
+def sentiment_codes(sentiment):
+    """Map Sentiment labels to integer codes into SENTIMENTS; unknown values count as neutral."""
+    codes = pd.Categorical(sentiment, categories=SENTIMENTS).codes.astype(np.int64)
+    codes[codes < 0] = SENTIMENTS.index('Neutral')
+    return codes
+
+
+def raw_magnitude(data):
+    return data['comment_score'].to_numpy(dtype=float)
+
+
+def log_magnitude(data):
+    # keeps the sign of the vote score but damps a few viral comments
+    scores = raw_magnitude(data)
+    return np.sign(scores) * np.log1p(np.abs(scores))
+
+
+def confidence_magnitude(data):
+    if 'confidence' not in data.columns:
+        raise ValueError("Confidence-weighted scoring needs a 'confidence' column in the dataset.")
+    return raw_magnitude(data) * data['confidence'].to_numpy(dtype=float)
+
+
+WEIGHTING_SCHEMES = {
+    'Raw': raw_magnitude,
+    'Log-dampened': log_magnitude,
+    'Confidence-weighted': confidence_magnitude,
+}
+
+
+def available_schemes(columns):
+    return [name for name in WEIGHTING_SCHEMES if name != 'Confidence-weighted' or 'confidence' in columns]
+
+
+def adjusted_score(data, scheme='Raw'):
+    """Sentiment-adjusted score per row: +magnitude if positive, -magnitude if negative, 0 otherwise."""
+    return SENTIMENT_WEIGHTS[sentiment_codes(data['Sentiment'])] * WEIGHTING_SCHEMES[scheme](data)
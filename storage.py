@@ -0,0 +1,108 @@
+"""Dataset loaders with a columnar (Parquet) fast path.
+
+Convert the bundled CSV files once with
+
+    python storage.py
+
+which writes a .parquet file next to the comments and sample CSVs, with
+timestamps already parsed and labeled_submission/Sentiment stored as
+categoricals. The loaders read the Parquet file when it exists and is not older
+than its CSV, and fall back to parsing the CSV otherwise.
+
+The app only shows a handful of sample rows, so the sample is cut down to
+SAMPLE_COLUMNS and a fixed draw of SAMPLE_ROWS rows before it is stored; the
+free-text and token columns never reach the Parquet copy. The price table is a
+few hundred rows and parses faster than Parquet reads, so it stays CSV only.
+"""
+import os
+
+import pandas as pd
+
+COMMENTS_PATH = 'r_CryptoCurrency_classified_compressed.csv'
+PRICES_PATH = 'daily_prices_dec_2024.csv'
+SAMPLE_PATH = 'r_CryptoCurrency_classified_sample.csv'
+
+CATEGORICAL_COLUMNS = ['labeled_submission', 'Sentiment']
+SAMPLE_COLUMNS = ['title', 'comment_body', 'comment_score', 'comment_created_utc', 'labeled_submission', 'Sentiment']
+SAMPLE_ROWS = 100
+SAMPLE_SEED = 0
+
+
+def binary_path(csv_path):
+    return os.path.splitext(csv_path)[0] + '.parquet'
+
+
+def has_fresh_binary(csv_path):
+    path = binary_path(csv_path)
+    if not os.path.exists(path):
+        return False
+    return not os.path.exists(csv_path) or os.path.getmtime(path) >= os.path.getmtime(csv_path)
+
+
+def _categorize(frame):
+    for column in CATEGORICAL_COLUMNS:
+        if column in frame.columns:
+            frame[column] = frame[column].astype('category')
+    return frame
+
+
+def read_comments_csv(path=COMMENTS_PATH):
+    data = pd.read_csv(path)
+    if 'created_utc' in data.columns:
+        data['created_utc'] = pd.to_datetime(data['created_utc'], dayfirst=True, errors='coerce')
+    return _categorize(data)
+
+
+def read_prices_csv(path=PRICES_PATH):
+    daily_prices = pd.read_csv(path)
+    if 'date' in daily_prices.columns:
+        daily_prices['date'] = pd.to_datetime(daily_prices['date'], dayfirst=True, errors='coerce')
+    return daily_prices
+
+
+def read_sample_csv(path=SAMPLE_PATH):
+    sample = pd.read_csv(path, usecols=SAMPLE_COLUMNS)[SAMPLE_COLUMNS]
+    if len(sample) > SAMPLE_ROWS:
+        sample = sample.sample(n=SAMPLE_ROWS, random_state=SAMPLE_SEED).reset_index(drop=True)
+    return _categorize(sample)
+
+
+def read_binary(csv_path, columns=None):
+    return pd.read_parquet(binary_path(csv_path), columns=columns)
+
+
+def _load(csv_path, read_csv, columns=None):
+    if has_fresh_binary(csv_path):
+        return read_binary(csv_path, columns)
+    return read_csv(csv_path)
+
+
+def load_comments(path=COMMENTS_PATH):
+    return _load(path, read_comments_csv)
+
+
+def load_prices(path=PRICES_PATH):
+    return read_prices_csv(path)
+
+
+def load_sample(path=SAMPLE_PATH):
+    return _load(path, read_sample_csv, SAMPLE_COLUMNS)
+
+
+def convert(csv_path, read_csv):
+    frame = read_csv(csv_path)
+    path = binary_path(csv_path)
+    frame.to_parquet(path, index=False)
+    return path
+
+
+def convert_all():
+    return [
+        convert(COMMENTS_PATH, read_comments_csv),
+        convert(SAMPLE_PATH, read_sample_csv),
+    ]
+
+
+if __name__ == '__main__':
+    for written in convert_all():
+        print(f"wrote {written}")
@@ -0,0 +1,32 @@
+"""lag_profile against pandas' shifted Pearson correlation."""
+import numpy as np
+import pandas as pd
+
+from correlation import lag_profile
+
+
+def test_lag_profile_matches_shifted_corr():
+    rng = np.random.default_rng(0)
+    x = rng.normal(size=(3, 40))
+    y = rng.normal(size=(3, 40)) + np.roll(x, 2, axis=1)
+    # gaps in either series, as left by buckets without comments or prices
+    x[rng.random(x.shape) < 0.15] = np.nan
+    y[rng.random(y.shape) < 0.15] = np.nan
+    max_lag = 4
+
+    corr, overlap = lag_profile(x, y, max_lag, min_overlap=2)
+
+    for series in range(len(x)):
+        score, price = pd.Series(x[series]), pd.Series(y[series])
+        for column, lag in enumerate(range(-max_lag, max_lag + 1)):
+            shifted = score.shift(lag)
+            assert overlap[series, column] == (shifted.notna() & price.notna()).sum()
+            np.testing.assert_allclose(corr[series, column], shifted.corr(price))
+
+
+def test_lag_profile_hides_short_overlaps():
+    x = np.arange(12, dtype=float)[None, :]
+    y = x ** 2
+    corr, overlap = lag_profile(x, y, max_lag=3, min_overlap=10)
+    assert np.isnan(corr[overlap < 10]).all()
+    assert np.isfinite(corr[overlap >= 10]).all()
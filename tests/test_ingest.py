@@ -0,0 +1,60 @@
+"""The running cubes over the ingest store match a cube built from all rows at once."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from aggregates import build_score_cube
+from benchmarks.synthetic import generate_comments
+from ingest import DailyAggregates, ingest_batch
+
+
+def assert_same_cube(actual, expected):
+    assert actual.buckets.equals(expected.buckets)
+    assert sorted(actual.labels) == sorted(expected.labels)
+    rows = actual.labels.get_indexer(expected.labels)
+    np.testing.assert_allclose(actual.values[rows], expected.values)
+    np.testing.assert_array_equal(actual.counts[rows], expected.counts)
+
+
+@pytest.mark.parametrize('scheme', ['Raw', 'Log-dampened'])
+def test_running_cube_matches_build_score_cube(tmp_path, scheme):
+    data = generate_comments(3000, coins=12, days=10, seed=1)
+    day = data['created_utc'].dt.day
+    batches = [
+        ('middle', data[day.between(4, 6)]),
+        # days before the first ingested one shift the history of the running cube
+        ('early', data[day <= 3]),
+        ('late', data[day >= 7].iloc[::2]),
+        # a second batch for days that already have aggregates
+        ('late-rest', data[day >= 7].iloc[1::2]),
+    ]
+
+    aggregates = DailyAggregates(str(tmp_path))
+    for batch_id, batch in batches:
+        ingest_batch(batch, str(tmp_path), batch_id)
+        aggregates.refresh()
+    # ingested again, e.g. after a crash before the file was moved, must not count twice
+    ingest_batch(batches[0][1], str(tmp_path), batches[0][0])
+    aggregates.refresh()
+
+    assert_same_cube(aggregates.cube(scheme), build_score_cube(data, scheme))
+    # a reader created later folds the same partitions from scratch
+    fresh = DailyAggregates(str(tmp_path))
+    fresh.refresh()
+    assert_same_cube(fresh.cube(scheme), build_score_cube(data, scheme))
+
+
+def test_cube_is_not_changed_by_later_ingests(tmp_path):
+    data = generate_comments(1000, coins=5, days=4, seed=2)
+    first = data['created_utc'] < pd.Timestamp('2024-12-03')
+
+    aggregates = DailyAggregates(str(tmp_path))
+    ingest_batch(data[first], str(tmp_path), 'first')
+    aggregates.refresh()
+    cube = aggregates.cube()
+    values = cube.values.copy()
+
+    ingest_batch(data[~first], str(tmp_path), 'second')
+    aggregates.refresh()
+    np.testing.assert_array_equal(cube.values, values)
+    assert_same_cube(aggregates.cube(), build_score_cube(data))